@@ -13,6 +13,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
 from medical_notes_processor.db.base import Base
 from medical_notes_processor.models.document import Document
+from medical_notes_processor.models.migration_progress import MigrationProgress
 from medical_notes_processor.core.config import settings
 
 # this is the Alembic Config object, which provides
@@ -2,76 +2,425 @@
 """
 Migration script to add patient_name and encounter_date columns to documents table
 and populate them from existing documents.
+
+Usage:
+    python scripts/migrate_add_metadata.py           # extract each document online
+    python scripts/migrate_add_metadata.py --batch   # submit OpenAI Batch API jobs
+    python scripts/migrate_add_metadata.py --flex    # extract online on the Flex tier
+
+Batch mode trades latency for cost: the notes are submitted as Batch API jobs
+that OpenAI completes asynchronously (within 24h, at half price), and the script
+polls until results are ready. Input beyond the per-file limits (50,000 requests
+or 200 MB) is split across several jobs; each job's results are saved as soon as
+it finishes, and if any job fails the script exits non-zero after saving the rest,
+so rerunning it resubmits only the unprocessed documents. Only patient name and
+encounter date are needed here, so batch mode skips the RxNorm/ICD-10 enrichment steps.
+
+--flex keeps the online pipeline but sends extraction calls with
+service_tier="flex": roughly half price in exchange for slower responses and
+occasional 429s, which the existing backoff retries. Flex only accepts certain
+models, so OPENAI_EXTRACTION_MODEL (and the fallback model) must be flex-eligible.
+
+Progress is checkpointed in the migration_progress table: every committed batch
+records its document ids in the same transaction, and later runs skip those
+documents, so a crashed run resumes where it stopped. Pass --reset-progress to
+clear the checkpoint and process every document again.
 """
+import argparse
 import asyncio
-from sqlalchemy import text, select
-
-# Import from the correct location based on environment
-try:
-    # Try Docker container path first
-    from medical_notes_processor.db.base import AsyncSessionLocal
-    from medical_notes_processor.agents.extraction_agent import extraction_agent
-    from medical_notes_processor.models.document import Document
-except ModuleNotFoundError:
-    # Fall back to local development path
-    from src.medical_notes_processor.db.base import AsyncSessionLocal
-    from src.medical_notes_processor.agents.extraction_agent import extraction_agent
-    from src.medical_notes_processor.models.document import Document
-
-
-async def migrate():
-    """Populate patient_name and encounter_date metadata."""
-    print("Starting migration...")
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from openai import RateLimitError
+from sqlalchemy import delete, exists, insert, select, update
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-    async with AsyncSessionLocal() as db:
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from medical_notes_processor.db.base import AsyncSessionLocal, engine
+from medical_notes_processor.agents.extraction_agent import MedicalExtractionAgent, extraction_agent
+from medical_notes_processor.models.document import Document
+from medical_notes_processor.models.migration_progress import MigrationProgress
+from medical_notes_processor.models.schemas import StructuredMedicalData
+
+
+# Seconds between Batch API status checks
+BATCH_POLL_INTERVAL = 30
+
+# Batch API per-file input limits; larger migrations are split across several batches
+BATCH_MAX_REQUESTS = 50_000
+BATCH_MAX_BYTES = 200 * 1024 * 1024
+
+# Online extractions kept in flight at once; tune to the account's OpenAI RPM/TPM headroom
+EXTRACTION_CONCURRENCY = 20
+
+# Rows fetched per keyset page (and written per bulk UPDATE)
+STREAM_BATCH_SIZE = 200
+
+# Queue marker telling a pipeline stage that no more items will arrive
+_DONE = object()
+
+
+def _metadata(structured_data: StructuredMedicalData) -> tuple:
+    """Pull (patient_name, encounter_date) out of extracted data."""
+    patient_name = None
+    if structured_data.patient and structured_data.patient.name:
+        patient_name = structured_data.patient.name
+    return patient_name, structured_data.encounter_date or None
+
+
+def _parse_date(value):
+    """Convert an extracted YYYY-MM-DD string to a date, dropping anything unparseable."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+async def bulk_update_metadata(db, updates: list) -> None:
+    """
+    Write all (doc_id, patient_name, encounter_date) tuples in one statement.
+
+    Uses SQLAlchemy's ORM bulk UPDATE by primary key, which the driver executes
+    as a single executemany instead of one round-trip per document. The ids are
+    also recorded in migration_progress, so committing the same transaction
+    checkpoints the batch.
+    """
+    if not updates:
+        return
+    await db.execute(
+        update(Document),
+        [
+            {"id": doc_id, "patient_name": patient_name, "encounter_date": _parse_date(encounter_date)}
+            for doc_id, patient_name, encounter_date in updates
+        ],
+    )
+    await db.execute(
+        insert(MigrationProgress),
+        [{"doc_id": doc_id} for doc_id, _, _ in updates],
+    )
+
+
+async def prepare_progress(reset: bool = False) -> None:
+    """Create the migration_progress checkpoint table if needed, optionally clearing it."""
+    async with engine.begin() as conn:
+        await conn.run_sync(MigrationProgress.__table__.create, checkfirst=True)
+        if reset:
+            await conn.execute(delete(MigrationProgress))
+
+
+@retry(
+    retry=retry_if_exception_type(RateLimitError),
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(min=2, max=60),
+    reraise=True,
+)
+async def _extract_with_backoff(agent: MedicalExtractionAgent, content: str) -> StructuredMedicalData:
+    """Extract one note, backing off further when OpenAI keeps returning 429s."""
+    return await agent.extract_structured_data(content)
+
+
+async def stream_documents():
+    """
+    Yield (doc_id, content) rows in STREAM_BATCH_SIZE chunks, ordered by id.
+
+    Each chunk is read with a keyset query (id > last seen id) in its own short
+    session, so no read transaction stays open while the writer commits.
+    Documents already checkpointed in migration_progress are skipped.
+    """
+    already_processed = exists().where(MigrationProgress.doc_id == Document.id)
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Document.id, Document.content)
+                .where(Document.id > last_id, ~already_processed)
+                .order_by(Document.id)
+                .limit(STREAM_BATCH_SIZE)
+            )
+            rows = [(doc_id, content) for doc_id, content in result]
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+async def produce_documents(extract_queue: asyncio.Queue, num_workers: int) -> int:
+    """Feed every document into the extraction queue, then one stop marker per worker."""
+    count = 0
+    async for documents in stream_documents():
+        for document in documents:
+            await extract_queue.put(document)
+        count += len(documents)
+    for _ in range(num_workers):
+        await extract_queue.put(_DONE)
+    return count
+
+
+async def extraction_worker(
+    agent: MedicalExtractionAgent, extract_queue: asyncio.Queue, write_queue: asyncio.Queue
+) -> None:
+    """Extract documents from the queue and hand their metadata to the writer."""
+    while True:
+        item = await extract_queue.get()
+        if item is _DONE:
+            return
+        doc_id, content = item
+        print(f"Processing document {doc_id}...")
         try:
-            # Columns should already exist from the model definition
-            # Just populate the data
-
-            # Get all documents
-            result = await db.execute(select(Document.id, Document.content))
-            documents = result.all()
-            print(f"Found {len(documents)} documents to process")
-
-            # Extract and update metadata for each document
-            for doc_id, content in documents:
-                print(f"Processing document {doc_id}...")
-                try:
-                    # Extract structured data
-                    structured_data = await extraction_agent.extract_structured_data(content)
-
-                    # Get patient name and encounter date
-                    patient_name = None
-                    encounter_date = None
-
-                    if structured_data.patient and structured_data.patient.name:
-                        patient_name = structured_data.patient.name
-
-                    if structured_data.encounter_date:
-                        encounter_date = structured_data.encounter_date
-
-                    # Update document
-                    await db.execute(
-                        text("""
-                            UPDATE documents
-                            SET patient_name = :patient_name,
-                                encounter_date = :encounter_date
-                            WHERE id = :id
-                        """),
-                        {"patient_name": patient_name, "encounter_date": encounter_date, "id": doc_id}
-                    )
-                    print(f"  ✓ Updated doc {doc_id}: {patient_name or 'N/A'}, {encounter_date or 'N/A'}")
-                except Exception as e:
-                    print(f"  ✗ Error processing doc {doc_id}: {str(e)}")
-
-            await db.commit()
-            print("\nMigration completed successfully!")
+            structured_data = await _extract_with_backoff(agent, content)
+        except Exception as e:
+            print(f"  ✗ Error processing doc {doc_id}: {str(e)}")
+            continue
+
+        # Get patient name and encounter date
+        patient_name, encounter_date = _metadata(structured_data)
+        print(f"  ✓ Extracted doc {doc_id}: {patient_name or 'N/A'}, {encounter_date or 'N/A'}")
+        await write_queue.put((doc_id, patient_name, encounter_date))
+
+
+async def write_metadata(write_queue: asyncio.Queue) -> int:
+    """
+    Coalesce extracted metadata into STREAM_BATCH_SIZE-row bulk UPDATEs.
+
+    Runs in its own session and commits after every batch, so database writes
+    overlap with the extractions still in flight. Returns the rows updated.
+    """
+    updated = 0
+    updates = []
+    async with AsyncSessionLocal() as db:
+        while True:
+            item = await write_queue.get()
+            if item is not _DONE:
+                updates.append(item)
+            if updates and (item is _DONE or len(updates) >= STREAM_BATCH_SIZE):
+                await bulk_update_metadata(db, updates)
+                await db.commit()
+                updated += len(updates)
+                print(f"Wrote {updated} documents so far")
+                updates = []
+            if item is _DONE:
+                return updated
+
+
+async def run_extraction_online(
+    agent: MedicalExtractionAgent, concurrency: int = EXTRACTION_CONCURRENCY
+) -> tuple:
+    """
+    Extract and update every document through a producer/consumer pipeline.
+
+    One producer streams documents into a bounded queue, `concurrency` workers
+    extract them, and a single writer batches the results into bulk UPDATEs.
+    Returns (documents processed, documents updated).
+    """
+    extract_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BATCH_SIZE * 2)
+
+    workers = [
+        asyncio.create_task(extraction_worker(agent, extract_queue, write_queue))
+        for _ in range(concurrency)
+    ]
+
+    async def feed() -> int:
+        processed = await produce_documents(extract_queue, len(workers))
+        await asyncio.gather(*workers)
+        await write_queue.put(_DONE)
+        return processed
+
+    feeder = asyncio.create_task(feed())
+    writer = asyncio.create_task(write_metadata(write_queue))
+    try:
+        processed, updated = await asyncio.gather(feeder, writer)
+    except BaseException:
+        # A failing stage would otherwise leave the others blocked on full queues
+        for task in (feeder, writer, *workers):
+            task.cancel()
+        raise
+    return processed, updated
+
+
+def _split_batch_payloads(requests: list) -> list:
+    """
+    Serialize Batch API request lines into JSONL payloads within the per-file limits.
+
+    Each payload holds at most BATCH_MAX_REQUESTS lines and BATCH_MAX_BYTES bytes.
+    Returns a list of (payload, request_count) tuples.
+    """
+    payloads = []
+    lines: list = []
+    size = 0
+    for request in requests:
+        line = json.dumps(request).encode("utf-8")
+        # Each line after the first also costs a newline separator
+        added = len(line) + (1 if lines else 0)
+        if lines and (len(lines) >= BATCH_MAX_REQUESTS or size + added > BATCH_MAX_BYTES):
+            payloads.append((b"\n".join(lines), len(lines)))
+            lines, size, added = [], 0, len(line)
+        lines.append(line)
+        size += added
+    if lines:
+        payloads.append((b"\n".join(lines), len(lines)))
+    return payloads
 
+
+async def run_extraction_batch(requests: list) -> int:
+    """
+    Extract documents through the OpenAI Batch API and write their metadata.
+
+    Splits the given Batch API request lines into JSONL files within the Batch API's
+    per-file limits and runs one batch per file concurrently. Each batch's results
+    are written and checkpointed as soon as it finishes, so a failed batch does not
+    discard the others and a rerun only resubmits documents without a checkpoint.
+    Returns the number of documents updated; if any batch failed, raises
+    RuntimeError naming them after every other batch has been saved.
+    """
+    payloads = _split_batch_payloads(requests)
+    updated = 0
+    failed = []
+    for finished in asyncio.as_completed([
+        _run_batch_part(payload, count, part)
+        for part, (payload, count) in enumerate(payloads, start=1)
+    ]):
+        part, results, error = await finished
+        if error is not None:
+            print(f"  ✗ Batch part {part}/{len(payloads)} failed: {str(error)}")
+            failed.append(part)
+            continue
+        updated += await _save_batch_results(results)
+
+    if failed:
+        parts = ", ".join(str(part) for part in sorted(failed))
+        raise RuntimeError(
+            f"{len(failed)}/{len(payloads)} batch parts failed ({parts}); "
+            f"rerun to resubmit their documents"
+        )
+    return updated
+
+
+async def _run_batch_part(payload: bytes, request_count: int, part: int) -> tuple:
+    """Run one batch, returning (part, results, error) instead of raising."""
+    try:
+        return part, await _run_batch(payload, request_count, part), None
+    except Exception as e:
+        return part, None, e
+
+
+async def _save_batch_results(results: dict) -> int:
+    """Write and checkpoint one finished batch's {doc_id: StructuredMedicalData}."""
+    updates = []
+    for doc_id, structured_data in results.items():
+        patient_name, encounter_date = _metadata(structured_data)
+        updates.append((doc_id, patient_name, encounter_date))
+        print(f"  ✓ Updated doc {doc_id}: {patient_name or 'N/A'}, {encounter_date or 'N/A'}")
+
+    async with AsyncSessionLocal() as db:
+        await bulk_update_metadata(db, updates)
+        await db.commit()
+    return len(updates)
+
+
+async def _run_batch(payload: bytes, request_count: int, part: int) -> dict:
+    """Upload one JSONL payload as a batch, wait for it and parse its results."""
+    client = extraction_agent.openai_client
+
+    batch_file = await client.files.create(
+        file=(f"metadata_migration_{part}.jsonl", payload),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} with {request_count} requests")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+        batch = await client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        if counts:
+            print(f"  Batch {batch.id} {batch.status}: {counts.completed}/{counts.total} done, {counts.failed} failed")
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    results = {}
+    if not batch.output_file_id:
+        return results
+
+    output = await client.files.content(batch.output_file_id)
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        doc_id = int(item["custom_id"])
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            print(f"  ✗ Error processing doc {doc_id}: {item.get('error') or response.get('body')}")
+            continue
+        try:
+            content = response["body"]["choices"][0]["message"]["content"]
+            results[doc_id] = StructuredMedicalData.model_validate_json(content)
         except Exception as e:
-            print(f"Migration failed: {str(e)}")
-            await db.rollback()
-            raise
+            print(f"  ✗ Error parsing result for doc {doc_id}: {str(e)}")
+
+    return results
+
+
+async def migrate(use_batch: bool = False, use_flex: bool = False, reset_progress: bool = False):
+    """Populate patient_name and encounter_date metadata."""
+    print("Starting migration...")
+
+    try:
+        # Columns should already exist from the model definition
+        # Just populate the data
+        await prepare_progress(reset=reset_progress)
+
+        if use_batch:
+            requests = []
+            async for documents in stream_documents():
+                requests.extend(
+                    extraction_agent.build_batch_request(str(doc_id), content)
+                    for doc_id, content in documents
+                )
+            print(f"Found {len(requests)} documents to process")
+
+            updated = await run_extraction_batch(requests)
+            print(f"\nMigration completed successfully! ({updated}/{len(requests)} documents updated)")
+            return
+
+        # Extraction and database writes overlap: workers keep calling the LLM
+        # while the writer commits finished batches
+        agent = MedicalExtractionAgent(service_tier="flex") if use_flex else extraction_agent
+        processed, updated = await run_extraction_online(agent)
+        print(f"\nMigration completed successfully! ({updated}/{processed} documents updated)")
+
+    except Exception as e:
+        print(f"Migration failed: {str(e)}")
+        raise
 
 
 if __name__ == "__main__":
-    asyncio.run(migrate())
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit all extractions as OpenAI Batch API jobs (cheaper, up to 24h)",
+    )
+    mode.add_argument(
+        "--flex",
+        action="store_true",
+        help="Run online extractions on the OpenAI Flex tier (cheaper, slower; flex-eligible models only)",
+    )
+    parser.add_argument(
+        "--reset-progress",
+        action="store_true",
+        help="Forget previously processed documents and migrate all of them again",
+    )
+    args = parser.parse_args()
+    asyncio.run(migrate(use_batch=args.batch, use_flex=args.flex, reset_progress=args.reset_progress))
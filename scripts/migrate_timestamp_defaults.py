@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Migration script to add database-side defaults to the timestamp columns.
+
+Usage:
+    python scripts/migrate_timestamp_defaults.py
+
+documents.created_at, documents.updated_at and migration_progress.processed_at
+are filled in by the database (current UTC time). Tables created by create_all before these defaults were introduced have no
+column default, so inserts that leave the timestamps out fail on NOT NULL.
+This script adds the defaults in place; existing rows are not touched.
+
+PostgreSQL gets ALTER COLUMN ... SET DEFAULT. SQLite cannot change a column
+default, so the table is copied into a new one with the defaults (Alembic's
+batch mode). Running the script again is harmless.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import DateTime, inspect
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from medical_notes_processor.db.base import engine, utcnow
+from medical_notes_processor.models.document import Document
+from medical_notes_processor.models.migration_progress import MigrationProgress
+
+# migration_progress only exists once scripts/migrate_add_metadata.py has run
+TIMESTAMP_COLUMNS = {
+    Document.__tablename__: ("created_at", "updated_at"),
+    MigrationProgress.__tablename__: ("processed_at",),
+}
+
+
+def add_timestamp_defaults(connection) -> None:
+    op = Operations(MigrationContext.configure(connection))
+    existing_tables = inspect(connection).get_table_names()
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        if table not in existing_tables:
+            continue
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(
+                    column,
+                    existing_type=DateTime(),
+                    existing_nullable=False,
+                    server_default=utcnow(),
+                )
+
+
+async def migrate():
+    """Set server defaults on the timestamp columns of existing tables."""
+    print("Starting migration...")
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(add_timestamp_defaults)
+        print("Migration completed successfully! (timestamp defaults set)")
+    except Exception as e:
+        print(f"Migration failed: {str(e)}")
+        raise
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -5,11 +5,35 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
+from sqlalchemy import insert, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from medical_notes_processor.db.base import AsyncSessionLocal
 from medical_notes_processor.models.document import Document
 
 
+async def bulk_insert_documents(session: AsyncSession, rows: list) -> None:
+    """
+    Insert (title, content) rows in a single round-trip.
+
+    On PostgreSQL the rows are streamed with asyncpg's COPY protocol; other
+    databases (SQLite for local development) fall back to one executemany INSERT.
+    Timestamps are left to the columns' server defaults in both cases.
+    """
+    conn = await session.connection()
+    if conn.dialect.name == "postgresql":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Document.__tablename__,
+            records=rows,
+            columns=["title", "content"],
+        )
+    else:
+        await session.execute(
+            insert(Document),
+            [{"title": title, "content": content} for title, content in rows],
+        )
+
+
 async def seed_documents():
     """Seed database with example SOAP notes."""
     example_notes_dir = Path(__file__).resolve().parent.parent / "example_notes"
@@ -25,24 +49,22 @@ async def seed_documents():
         return
 
     async with AsyncSessionLocal() as session:
-        # Check if documents already exist
-        from sqlalchemy import select, func
-        result = await session.execute(select(func.count(Document.id)))
-        count = result.scalar()
-
-        if count > 0:
-            print(f"Database already has {count} documents. Skipping seed.")
+        # Check if documents already exist (stops at the first row instead of counting)
+        result = await session.execute(select(literal(1)).select_from(Document).limit(1))
+        if result.scalar() is not None:
+            print("Database already has documents. Skipping seed.")
             return
 
         # Add documents
+        rows = []
         for soap_file in soap_files:
             content = soap_file.read_text()
             title = f"Medical Note - {soap_file.stem.replace('soap_', 'Case ')}"
 
-            document = Document(title=title, content=content)
-            session.add(document)
+            rows.append((title, content))
             print(f"Added: {title}")
 
+        await bulk_insert_documents(session, rows)
         await session.commit()
         print(f"\nSuccessfully seeded {len(soap_files)} documents")
 
@@ -1,146 +1,217 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from typing import Dict, Any
-import json
+from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
 import logging
-from openai import AsyncOpenAI
-from pydantic import BaseModel
+import httpx
+from openai import AsyncOpenAI, pydantic_function_tool
 
+from ..core.cache import get_cache
 from ..core.config import settings
 from ..models.schemas import StructuredMedicalData
 from ..utils.external_apis import external_api_client
 
 logger = logging.getLogger(__name__)
 
+# Field structure comes from the StructuredMedicalData response schema, so the prompt
+# only carries behavioural guidance that the schema cannot express.
+EXTRACTION_SYSTEM_PROMPT = """You are a medical information extraction and coding expert.
+Extract patient, encounter date, SOAP sections, vitals, conditions, medications, labs, assessment and plan from the note.
+
+Conditions: assign the most appropriate ICD-10 code (suggested_icd10_code) by clinical reasoning, even if not stated.
+- Routine encounters: Z codes (e.g., Z00.00); family history: Z8x (e.g., Z83.42); screening/observations: e.g., E66.3
+- code_reasoning: one sentence justifying the code
+- confidence: "high" = explicitly documented; "medium" = inferred from context, symptoms or medications; "low" = ambiguous, needs review"""
+
+
+# Strict JSON-schema response_format for StructuredMedicalData, for requests built by
+# hand (Batch API lines). The public function-tool helper produces the same strict
+# schema that `beta.chat.completions.parse` sends for response_format=StructuredMedicalData.
+_extraction_tool = pydantic_function_tool(StructuredMedicalData)["function"]
+EXTRACTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": _extraction_tool["name"],
+        "strict": True,
+        "schema": _extraction_tool["parameters"],
+    },
+}
+
+# Flex requests can queue for a long time before starting; OpenAI recommends a
+# timeout of up to 15 minutes instead of the client default
+FLEX_TIMEOUT = 900.0
+
+# One OpenAI client (and connection pool) shared by every agent instance. HTTP/2 and
+# keep-alive avoid a TLS handshake per call, and the connection cap is high enough
+# that concurrent extractions (asyncio.gather, migration workers) are not throttled.
+_http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+openai_client = AsyncOpenAI(api_key=settings.openai_api_key, http_client=_http_client)
+
 
 class MedicalExtractionAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            api_key=settings.openai_api_key,
-            temperature=0.0,
-        )
-        # Use native OpenAI client for structured outputs
-        self.openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    def __init__(self, service_tier: Optional[str] = None):
+        """
+        Args:
+            service_tier: OpenAI processing tier for extraction calls. Leave unset for
+                interactive use; offline jobs can pass "flex" for cheaper, slower
+                processing (requires a flex-eligible extraction model).
+        """
+        self.service_tier = service_tier
+        # Native OpenAI client for structured outputs; with_options shares its pool
+        if service_tier == "flex":
+            self.openai_client = openai_client.with_options(timeout=FLEX_TIMEOUT)
+        else:
+            self.openai_client = openai_client
 
     async def extract_structured_data(self, medical_note: str) -> StructuredMedicalData:
         """
         Multi-step agent that:
         1. Extracts raw structured data from medical note
         2. Enriches medications with RxNorm codes
-        3. Enriches conditions with ICD-10 codes
+        3. Enriches conditions with ICD-10 codes (concurrently with step 2)
         4. Returns validated structured data
-        """
-        # Step 1: Extract raw data using LLM
-        raw_data = await self._extract_raw_data(medical_note)
-
-        # Step 2: Enrich medications with RxNorm codes
-        if raw_data.get("medications"):
-            # raw_data is already a dict from LLM, not Pydantic models
-            enriched_meds = await external_api_client.enrich_medications(
-                raw_data["medications"]
-            )
-            raw_data["medications"] = enriched_meds
 
-        # Step 3: Enrich conditions with ICD-10 codes
-        if raw_data.get("conditions"):
-            enriched_conditions = await external_api_client.enrich_conditions(
-                raw_data["conditions"]
-            )
-            raw_data["conditions"] = enriched_conditions
+        Extraction runs at temperature 0, so the raw LLM result is cached by a hash of
+        the models, prompt and note; identical notes skip the LLM call. Enrichment
+        always re-runs so a failed code lookup is retried rather than frozen in the
+        cache (the lookups themselves are cached by name).
+        """
+        cache_key = self._cache_key(medical_note)
+        extracted = await self._get_cached(cache_key)
+        if extracted is None:
+            # Step 1: Extract raw data using LLM
+            extracted = await self._extract_raw_data(medical_note)
+            await self._set_cached(cache_key, extracted)
+        raw_data = extracted.model_dump()
+
+        # Steps 2 & 3: Enrich medications (RxNorm) and conditions (ICD-10) concurrently.
+        # The lookups hit independent services, so there is no reason to wait on one
+        # before starting the other. raw_data is a dict from the LLM, not Pydantic models.
+        enriched_meds, enriched_conditions = await asyncio.gather(
+            external_api_client.enrich_medications(raw_data.get("medications") or []),
+            external_api_client.enrich_conditions(raw_data.get("conditions") or []),
+        )
+        raw_data["medications"] = enriched_meds
+        raw_data["conditions"] = enriched_conditions
 
         # Step 4: Validate and return structured data
-        structured_data = StructuredMedicalData(**raw_data)
-        return structured_data
-
-    async def _extract_raw_data(self, medical_note: str) -> Dict[str, Any]:
-        """Use LLM with structured outputs to extract data from medical note."""
-        system_prompt = """You are a medical information extraction expert with expertise in medical coding.
-Extract structured data from the medical note.
-
-Extract the following information:
-1. Patient information (name, DOB, gender, patient_id)
-2. Encounter date
-3. Chief complaint
-4. Subjective findings
-5. Objective findings
-6. Vital signs (BP, HR, temperature, respiratory rate, O2 saturation)
-7. Conditions/diagnoses (name, status, suggested_icd10_code)
-8. Medications (name, dosage, frequency, route)
-9. Lab results (test_name, value, unit, reference_range)
-10. Assessment
-11. Plan actions (action_type, description, timing)
-
-IMPORTANT for conditions: Assign the most appropriate ICD-10 code based on clinical reasoning.
-- For routine encounters: Use Z codes (e.g., Z00.00 for general adult exam)
-- For family history: Use Z8x codes (e.g., Z83.42 for family history of hyperlipidemia)
-- For screening/observations: Use appropriate codes (e.g., E66.3 for overweight)
-- Be clinically intelligent - assign codes even when not explicitly stated in documentation
-
-For each condition, also provide:
-- confidence: "high", "medium", or "low" based on documentation clarity
-- code_reasoning: brief explanation (1 sentence) for the code assignment
-
-Confidence Levels:
-- HIGH: Explicitly stated diagnosis with clear documentation
-- MEDIUM: Implied or inferred from context, symptoms, or medications
-- LOW: Uncertain or ambiguous, may need review"""
+        return StructuredMedicalData(**raw_data)
+
+    def _cache_key(self, medical_note: str) -> str:
+        # Both models and the prompt shape the result, so changing any of them
+        # invalidates earlier extractions
+        digest = hashlib.sha256(
+            "\n".join([
+                settings.openai_extraction_model,
+                settings.openai_extraction_fallback_model or "",
+                EXTRACTION_SYSTEM_PROMPT,
+                medical_note,
+            ]).encode("utf-8")
+        ).hexdigest()
+        return f"extraction:{digest}"
+
+    async def _get_cached(self, cache_key: str) -> Optional[StructuredMedicalData]:
+        # Cache failures (e.g. Redis down) must never fail an extraction
+        try:
+            cached = await get_cache().get(cache_key)
+            if cached is not None:
+                return StructuredMedicalData.model_validate_json(cached)
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed: {str(e)}")
+        return None
 
+    async def _set_cached(self, cache_key: str, structured_data: StructuredMedicalData) -> None:
         try:
-            # Try structured outputs with Pydantic (works with gpt-4o-2024-08-06+)
+            await get_cache().set(
+                cache_key, structured_data.model_dump_json(), ttl=settings.extraction_cache_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed: {str(e)}")
+
+    def build_batch_request(self, custom_id: str, medical_note: str) -> Dict[str, Any]:
+        """
+        Build one OpenAI Batch API request line for a medical note.
+
+        The body mirrors the structured-output call made by `_extract_raw_data`, so
+        batch results can be validated straight into StructuredMedicalData.
+        """
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": settings.openai_extraction_model,
+                "messages": self._build_messages(medical_note),
+                "response_format": EXTRACTION_RESPONSE_FORMAT,
+                "temperature": 0.0,
+            },
+        }
+
+    def _build_messages(self, medical_note: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Medical Note:\n\n{medical_note}"}
+        ]
+
+    async def _extract_raw_data(self, medical_note: str) -> StructuredMedicalData:
+        """
+        Use LLM with structured outputs to extract data from medical note.
+
+        The note is first extracted with the fast extraction model. If any condition
+        comes back with low confidence, it is re-extracted once with the larger
+        fallback model; the first result is kept if that second pass fails.
+        """
+        parsed = await self._parse_note(medical_note, settings.openai_extraction_model)
+
+        fallback_model = settings.openai_extraction_fallback_model
+        if fallback_model and fallback_model != settings.openai_extraction_model and self._needs_review(parsed):
+            logger.info(f"Low-confidence extraction, re-running with {fallback_model}")
             try:
-                completion = await self.openai_client.beta.chat.completions.parse(
-                    model=settings.openai_model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Medical Note:\n\n{medical_note}"}
-                    ],
-                    response_format=StructuredMedicalData,
-                    temperature=0.0,
-                )
-                parsed_data = completion.choices[0].message.parsed
-                return parsed_data.model_dump()
-
-            except Exception as struct_error:
-                # Fallback to JSON mode with manual parsing for older models
-                logger.warning(f"Structured outputs not supported, using JSON mode: {str(struct_error)}")
-
-                # Add explicit JSON schema to prompt for json_object mode
-                schema_prompt = system_prompt + """\n\nReturn valid JSON with this exact structure:
-{
-  "patient": {"name": "string", "date_of_birth": "YYYY-MM-DD", "gender": "string", "patient_id": "string"},
-  "encounter_date": "YYYY-MM-DD",
-  "chief_complaint": "string",
-  "subjective": "string",
-  "objective": "string",
-  "vital_signs": {"blood_pressure": "string", "heart_rate": "string", "temperature": "string", "respiratory_rate": "string", "oxygen_saturation": "string"},
-  "conditions": [{"name": "string", "status": "string", "suggested_icd10_code": "string", "confidence": "high|medium|low", "code_reasoning": "string"}],
-  "medications": [{"name": "string", "dosage": "string", "frequency": "string", "route": "string"}],
-  "lab_results": [{"test_name": "string", "value": "string", "unit": "string", "reference_range": "string"}],
-  "assessment": "string",
-  "plan_actions": [{"action_type": "string", "description": "string", "timing": "string"}]
-}"""
-
-                completion = await self.openai_client.chat.completions.create(
-                    model=settings.openai_model,
-                    messages=[
-                        {"role": "system", "content": schema_prompt},
-                        {"role": "user", "content": f"Medical Note:\n\n{medical_note}"}
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0.0,
-                )
-
-                content = completion.choices[0].message.content
-                data = json.loads(content)
-
-                # Validate with Pydantic
-                validated = StructuredMedicalData(**data)
-                return validated.model_dump()
+                parsed = await self._parse_note(medical_note, fallback_model)
+            except Exception as e:
+                logger.warning(f"Fallback extraction failed, keeping first result: {str(e)}")
+
+        return parsed
+
+    async def _parse_note(self, medical_note: str, model: str) -> StructuredMedicalData:
+        """
+        Run one structured-output extraction call.
+
+        The response schema is derived from StructuredMedicalData and enforced by
+        the API, so the parsed model is returned directly without any JSON handling.
+        Predicted Outputs are not sent: the API rejects them alongside a structured
+        response_format.
+        """
+        extra_args: Dict[str, Any] = {}
+        if self.service_tier:
+            extra_args["service_tier"] = self.service_tier
+
+        try:
+            completion = await self.openai_client.beta.chat.completions.parse(
+                model=model,
+                messages=self._build_messages(medical_note),
+                response_format=StructuredMedicalData,
+                temperature=0.0,
+                **extra_args,
+            )
+            message = completion.choices[0].message
+            if message.parsed is None:
+                raise ValueError(f"Model returned no structured data: {message.refusal or 'empty response'}")
+            return message.parsed
 
         except Exception as e:
             logger.error(f"Error extracting structured data: {str(e)}")
             raise
 
+    @staticmethod
+    def _needs_review(structured_data: StructuredMedicalData) -> bool:
+        """Check whether any condition code was assigned with low confidence."""
+        return any(
+            (condition.confidence or "").lower() == "low"
+            for condition in structured_data.conditions
+        )
+
 
 extraction_agent = MedicalExtractionAgent()
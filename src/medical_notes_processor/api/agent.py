@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 async def extract_structured_data(request: ExtractStructuredRequest):
     try:
         structured_data = await extraction_agent.extract_structured_data(request.text)
-        return ExtractStructuredResponse(structured_data=structured_data)
+        return ExtractStructuredResponse.model_construct(structured_data=structured_data)
     except Exception as e:
         logger.error(f"Error extracting structured data: {str(e)}")
         raise HTTPException(
@@ -4,19 +4,44 @@ from typing import Optional, List, Dict
 import logging
 from collections import defaultdict
 
+import orjson
+
+from ..core.cache import get_history_cache
+from ..core.config import settings
 from ..services.chatbot_service import get_chatbot_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Simple in-memory conversation storage (session_id -> messages)
-conversations: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+# Conversation history lives in the history cache (Redis when configured) so every
+# worker sees the same session; only the last MAX_HISTORY_MESSAGES are kept
+MAX_HISTORY_MESSAGES = 20
 
 # Cache for extracted structured data to avoid re-processing
 # Format: {session_id: {doc_id: structured_data}}
 extraction_cache: Dict[str, Dict[int, Dict]] = defaultdict(dict)
 
 
+def _history_key(session_id: str) -> str:
+    return f"chat:{session_id}"
+
+
+async def load_history(session_id: str) -> List[Dict[str, str]]:
+    """Fetch the stored conversation for a session, oldest message first."""
+    messages = await get_history_cache().get_list(_history_key(session_id))
+    return [orjson.loads(message) for message in messages]
+
+
+async def append_history(session_id: str, messages: List[Dict[str, str]]) -> None:
+    """Append messages to a session and trim it to the last MAX_HISTORY_MESSAGES."""
+    await get_history_cache().append_list(
+        _history_key(session_id),
+        [orjson.dumps(message).decode() for message in messages],
+        maxlen=MAX_HISTORY_MESSAGES,
+        ttl=settings.chat_history_ttl,
+    )
+
+
 class ChatRequest(BaseModel):
     message: str
     note_id: Optional[int] = None
@@ -48,7 +73,7 @@ async def chat(request: ChatRequest):
         session_id = request.session_id or "default"
 
         # Get conversation history
-        history = conversations[session_id]
+        history = await load_history(session_id)
 
         chatbot = get_chatbot_service()
 
@@ -62,13 +87,11 @@ async def chat(request: ChatRequest):
             extraction_cache=session_cache
         )
 
-        # Store in conversation history
-        conversations[session_id].append({"role": "user", "content": request.message})
-        conversations[session_id].append({"role": "assistant", "content": response_text})
-
-        # Keep last 20 messages to prevent memory bloat
-        if len(conversations[session_id]) > 20:
-            conversations[session_id] = conversations[session_id][-20:]
+        # Store in conversation history (trimmed to the last 20 messages)
+        await append_history(session_id, [
+            {"role": "user", "content": request.message},
+            {"role": "assistant", "content": response_text},
+        ])
 
         return ChatResponse(response=response_text, session_id=session_id)
     except Exception as e:
@@ -82,8 +105,7 @@ async def chat(request: ChatRequest):
 @router.post("/chat/reset")
 async def reset_conversation(session_id: str = "default"):
     """Reset conversation history and extraction cache for a session."""
-    if session_id in conversations:
-        del conversations[session_id]
+    await get_history_cache().delete(_history_key(session_id))
     if session_id in extraction_cache:
         del extraction_cache[session_id]
     return {"message": f"Conversation and cache reset for session {session_id}"}
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete
+from sqlalchemy.orm import undefer
 from typing import List
+import logging
 
+from ..core.cache import document_cache_key, get_cache
 from ..db.base import get_db
 from ..models.document import Document
-from ..models.schemas import DocumentCreate, DocumentResponse
+from ..models.schemas import DocumentBatchRequest, DocumentCreate, DocumentResponse, DocumentSummary
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.get("", response_model=List[int])
@@ -17,17 +21,37 @@ async def get_all_document_ids(db: AsyncSession = Depends(get_db)):
     return list(ids)
 
 
-@router.get("/all", response_model=List[DocumentResponse])
+@router.get("/all", response_model=List[DocumentSummary])
 async def get_all_documents(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Document))
+    # Listing only needs metadata; skip loading the (large) content column
+    result = await db.execute(
+        select(Document.id, Document.title, Document.patient_name, Document.encounter_date)
+    )
+    return [DocumentSummary.model_construct(**row._mapping) for row in result]
+
+
+@router.get("/all/full", response_model=List[DocumentResponse])
+async def get_all_documents_full(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Document).options(undefer(Document.content)))
     documents = result.scalars().all()
     return documents
 
 
+@router.post("/batch", response_model=List[DocumentResponse])
+async def get_documents_batch(request: DocumentBatchRequest, db: AsyncSession = Depends(get_db)):
+    # One query for several documents instead of a GET per ID; returned in request
+    # order, with unknown IDs skipped and duplicates returned once
+    result = await db.execute(
+        select(Document).where(Document.id.in_(request.ids)).options(undefer(Document.content))
+    )
+    documents = {document.id: document for document in result.scalars()}
+    return [documents[doc_id] for doc_id in dict.fromkeys(request.ids) if doc_id in documents]
+
+
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(document_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Document).where(Document.id == document_id))
-    document = result.scalar_one_or_none()
+    # Primary-key lookup; served from the identity map when already loaded
+    document = await db.get(Document, document_id, options=[undefer(Document.content)])
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -46,19 +70,29 @@ async def create_document(
         content=document.content
     )
     db.add(db_document)
+    # flush assigns the id and column defaults; a refresh would only expire the
+    # deferred content column we already hold
     await db.flush()
-    await db.refresh(db_document)
     return db_document
 
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(document_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Document).where(Document.id == document_id))
-    document = result.scalar_one_or_none()
-    if not document:
+    # Single DELETE ... RETURNING instead of SELECT followed by DELETE
+    result = await db.execute(
+        delete(Document).where(Document.id == document_id).returning(Document.id)
+    )
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Document with id {document_id} not found"
         )
-    await db.delete(document)
+    # Evict only after commit, otherwise a read between eviction and commit would
+    # re-cache the row; a cache failure (e.g. Redis down) must not undo the delete,
+    # it only leaves the document cached until its TTL expires
+    await db.commit()
+    try:
+        await get_cache().delete(document_cache_key(document_id))
+    except Exception as e:
+        logger.warning(f"Document cache eviction failed: {str(e)}")
     return None
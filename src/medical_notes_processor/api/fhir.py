@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 async def convert_to_fhir(request: ToFHIRRequest):
     try:
         fhir_bundle = fhir_service.convert_to_fhir(request.structured_data)
-        return ToFHIRResponse(fhir_bundle=fhir_bundle)
+        return ToFHIRResponse.model_construct(fhir_bundle=fhir_bundle)
     except Exception as e:
         logger.error(f"Error converting to FHIR: {str(e)}")
         raise HTTPException(
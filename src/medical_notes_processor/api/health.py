@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
+
+from ..core.config import settings
+from ..db.base import get_pool_status
 
 router = APIRouter()
 
@@ -6,3 +9,11 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/debug/pool")
+async def pool_status():
+    """Database connection pool usage (only available when debug is enabled)."""
+    if not settings.debug:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return get_pool_status()
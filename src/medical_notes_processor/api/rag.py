@@ -1,39 +1,62 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, RowMapping
+from typing import Sequence
 import logging
 
 from ..models.schemas import QuestionRequest, QuestionResponse
-from ..services.rag_service import get_rag_service
+from ..services.rag_service import INDEX_BATCH_SIZE, INDEX_CONCURRENCY, get_rag_service
 from ..db.base import get_db
 from ..models.document import Document
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Documents read per page: enough to keep every concurrent index upload busy
+INDEX_PAGE_SIZE = INDEX_BATCH_SIZE * INDEX_CONCURRENCY
+
+
+async def _fetch_index_page(db: AsyncSession, after_id: int) -> Sequence[RowMapping]:
+    """
+    Read the next INDEX_PAGE_SIZE documents with id > after_id.
+
+    Rows are returned as dict-like RowMappings, which the RAG service reads by
+    key, so no ORM instances or intermediate dicts are built per document.
+    """
+    result = await db.execute(
+        select(Document.id, Document.title, Document.content)
+        .where(Document.id > after_id)
+        .order_by(Document.id)
+        .limit(INDEX_PAGE_SIZE)
+    )
+    return result.mappings().all()
+
 
 @router.post("/index_documents")
 async def index_documents(db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(Document))
-        documents = result.scalars().all()
+        # Page through documents by id instead of loading every row at once, so
+        # memory stays bounded by one page. Each page is a separate short query,
+        # which keeps SQLite from holding a read lock for the whole indexing run.
+        doc_dicts = await _fetch_index_page(db, after_id=0)
 
-        if not documents:
+        if not doc_dicts:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No documents found in database to index"
             )
 
-        doc_dicts = [
-            {"id": doc.id, "title": doc.title, "content": doc.content}
-            for doc in documents
-        ]
-
-        await get_rag_service().index_documents(doc_dicts)
+        rag_service = get_rag_service()
+        document_count = 0
+        async with rag_service.bulk_load():
+            while doc_dicts:
+                await rag_service.index_documents(doc_dicts)
+                document_count += len(doc_dicts)
+                doc_dicts = await _fetch_index_page(db, after_id=doc_dicts[-1]["id"])
 
         return {
-            "message": f"Successfully indexed {len(documents)} documents",
-            "document_count": len(documents)
+            "message": f"Successfully indexed {document_count} documents",
+            "document_count": document_count
         }
     except HTTPException:
         raise
@@ -49,7 +72,8 @@ async def index_documents(db: AsyncSession = Depends(get_db)):
 async def answer_question(request: QuestionRequest):
     try:
         result = await get_rag_service().answer_question(request.question)
-        return QuestionResponse(**result)
+        # result comes from our own RAG service, not the client, so skip re-validation
+        return QuestionResponse.model_construct(**result)
     except Exception as e:
         logger.error(f"Error answering question: {str(e)}")
         raise HTTPException(
@@ -0,0 +1,155 @@
+"""
+Key/value cache shared across services.
+
+When `settings.redis_url` is configured, values are stored in Redis so every
+worker process shares the same cache; otherwise a bounded in-process LRU is
+used. Chat histories get their own unbounded in-process cache (see
+get_history_cache) so other entries can never evict them. Both backends store plain strings (callers serialize to JSON) and expose
+the same async interface: get/set/delete for single values, plus
+get_list/append_list for capped lists such as chat histories.
+"""
+
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple, Union
+import logging
+import time
+
+import redis.asyncio as redis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCache:
+    """
+    Per-process LRU cache with optional per-key TTL.
+
+    Attributes:
+        maxsize (Optional[int]): Maximum number of entries kept before evicting the
+            least recently used one; None never evicts, so entries only leave by TTL
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    def _lookup(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any, ttl: Optional[int]) -> None:
+        now = time.monotonic()
+        self._data[key] = (now + ttl if ttl else None, value)
+        self._data.move_to_end(key)
+        # Least recently used entries sit at the front; drop the expired ones there so
+        # abandoned keys don't pile up when nothing is evicted by size
+        while self._data:
+            expires_at, _ = next(iter(self._data.values()))
+            if expires_at is None or expires_at > now:
+                break
+            self._data.popitem(last=False)
+        while self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._lookup(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self._store(key, value, ttl)
+
+    async def get_list(self, key: str) -> List[str]:
+        return list(self._lookup(key) or [])
+
+    async def append_list(self, key: str, values: List[str], maxlen: int, ttl: Optional[int] = None) -> None:
+        items = (self._lookup(key) or []) + list(values)
+        self._store(key, items[-maxlen:], ttl)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def aclose(self) -> None:
+        self._data.clear()
+
+
+class RedisCache:
+    """Redis-backed cache shared by all worker processes."""
+
+    def __init__(self, url: str):
+        self.client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def get_list(self, key: str) -> List[str]:
+        return await self.client.lrange(key, 0, -1)
+
+    async def append_list(self, key: str, values: List[str], maxlen: int, ttl: Optional[int] = None) -> None:
+        # Push and trim in one MULTI/EXEC so concurrent requests never see an over-long list
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *values)
+            pipe.ltrim(key, -maxlen, -1)
+            if ttl:
+                pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def document_cache_key(doc_id: int) -> str:
+    """Cache key for a document as cached by the chatbot and evicted on delete."""
+    return f"document:{doc_id}"
+
+
+# Lazy initialization so importing this module never opens a connection
+cache: Optional[Union[InMemoryCache, RedisCache]] = None
+history_cache: Optional[Union[InMemoryCache, RedisCache]] = None
+
+
+def get_cache() -> Union[InMemoryCache, RedisCache]:
+    global cache
+    if cache is None:
+        if settings.redis_url:
+            cache = RedisCache(settings.redis_url)
+            logger.info("Using Redis cache")
+        else:
+            cache = InMemoryCache()
+    return cache
+
+
+def get_history_cache() -> Union[InMemoryCache, RedisCache]:
+    """
+    Cache for chat histories, which must only expire by settings.chat_history_ttl.
+
+    Redis does not evict keys here, so the shared cache is reused; the in-process
+    fallback is a separate cache with no size bound, since the general one would
+    let cached documents and extractions evict live conversations.
+    """
+    global history_cache
+    if history_cache is None:
+        history_cache = get_cache() if settings.redis_url else InMemoryCache(maxsize=None)
+    return history_cache
+
+
+async def close_cache() -> None:
+    global cache, history_cache
+    if history_cache is not None and history_cache is not cache:
+        await history_cache.aclose()
+    history_cache = None
+    if cache is not None:
+        await cache.aclose()
+        cache = None
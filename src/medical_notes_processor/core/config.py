@@ -1,4 +1,4 @@
-from typing import List
+from typing import Optional, Tuple
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import json
@@ -9,44 +9,83 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        # Settings are read on every request path; freezing guarantees they are
+        # validated exactly once at import and never mutated afterwards
+        frozen=True,
     )
 
     # LLM Configuration
     openai_api_key: str
     openai_model: str = "gpt-4-turbo-preview"
+    # Structured extraction runs on a smaller, structured-output capable model. When it
+    # returns low-confidence codes, the note is re-extracted with the fallback model
+    # (set to an empty string to disable the second pass).
+    openai_extraction_model: str = "gpt-4o-mini"
+    openai_extraction_fallback_model: str = "gpt-4o"
 
     # Database Configuration
     database_url: str
     sync_database_url: str
+    # Connection pool (ignored for SQLite)
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800  # seconds
+
+    @field_validator("database_url")
+    @classmethod
+    def require_async_driver(cls, v):
+        # A sync driver (e.g. psycopg2) would block the event loop on every query
+        if not v.startswith(("postgresql+asyncpg://", "sqlite+aiosqlite://")):
+            raise ValueError(
+                "database_url must use an async driver: postgresql+asyncpg:// or sqlite+aiosqlite://"
+            )
+        return v
 
     # Qdrant Configuration
     qdrant_host: str = "qdrant"
     qdrant_port: int = 6333
     qdrant_collection_name: str = "medical_documents"
+    qdrant_indexing_threshold: int = 20000  # KB; server default, restored after bulk loads
+
+    # Cache Configuration (in-process cache is used when redis_url is unset)
+    redis_url: Optional[str] = None
+    extraction_cache_ttl: int = 7 * 24 * 3600  # seconds
+    summary_cache_ttl: int = 7 * 24 * 3600  # seconds; note summaries by note text
+    code_lookup_cache_ttl: int = 30 * 24 * 3600  # seconds; RxNorm/ICD-10 lookups by name
+    chat_history_ttl: int = 24 * 3600  # seconds since a session's last message
+    document_cache_ttl: int = 300  # seconds; documents read by the chatbot
+    rag_answer_cache_ttl: int = 3600  # seconds; answers to repeated questions
 
     # Application Configuration
     app_name: str = "Medical Notes Processor"
     app_version: str = "0.1.0"
     debug: bool = True
     log_level: str = "INFO"
+    sql_echo: bool = False  # log every SQL statement (separate from debug; very verbose)
+    # uvicorn worker processes for `main()` (ignored when debug enables reload). Each
+    # worker has its own in-process cache and runs startup seeding, so set redis_url
+    # and seed the database beforehand when running more than one.
+    workers: int = 1
 
     # CORS Configuration
-    allowed_origins: List[str] | str = ["http://localhost:3000", "http://localhost:8000"]
+    allowed_origins: Tuple[str, ...] | str = ("http://localhost:3000", "http://localhost:8000")
 
     @field_validator("allowed_origins", mode="before")
     @classmethod
     def parse_cors(cls, v):
         if isinstance(v, str):
             try:
-                return json.loads(v)
+                v = json.loads(v)
             except json.JSONDecodeError:
-                return [origin.strip() for origin in v.split(",")]
-        return v
+                v = [origin.strip() for origin in v.split(",")]
+        return tuple(v)
 
     # External APIs
     nlm_api_base_url: str = "https://rxnav.nlm.nih.gov/REST"
     clinicaltables_api_base_url: str = "https://clinicaltables.nlm.nih.gov/api"
+    # NLM asks clients to stay under 20 requests per second; this caps lookups in flight
+    nlm_max_concurrent_lookups: int = 5
 
 
 settings = Settings()
\ No newline at end of file
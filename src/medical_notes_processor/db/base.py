@@ -1,6 +1,10 @@
+from sqlalchemy import DateTime, event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from typing import AsyncGenerator
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.functions import FunctionElement
+from typing import AsyncGenerator, Dict, Any
 from ..core.config import settings
 
 
@@ -8,13 +12,80 @@ class Base(DeclarativeBase):
     pass
 
 
+class utcnow(FunctionElement):
+    """
+    Current UTC time as a naive timestamp, for server-side column defaults.
+
+    PostgreSQL's now() is in the session time zone, so it is converted to UTC;
+    SQLite's CURRENT_TIMESTAMP is already UTC.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw) -> str:
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _compile_utcnow_postgresql(element, compiler, **kw) -> str:
+    return "timezone('utc', CURRENT_TIMESTAMP)"
+
+
+def _pool_options() -> Dict[str, Any]:
+    """Connection pool sizing for server databases; SQLite keeps its default pool."""
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
 # Async engine for database operations
 engine = create_async_engine(
     settings.database_url,
-    echo=settings.debug,
+    echo=settings.sql_echo,
     future=True,
+    **_pool_options(),
 )
 
+# Connections currently and at most checked out, for /debug/pool
+pool_usage = {"checked_out": 0, "peak_checked_out": 0}
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_usage["checked_out"] += 1
+    pool_usage["peak_checked_out"] = max(pool_usage["peak_checked_out"], pool_usage["checked_out"])
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_usage["checked_out"] = max(pool_usage["checked_out"] - 1, 0)
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """Snapshot of the engine's connection pool usage."""
+    pool = engine.pool
+    status = {
+        "pool_class": type(pool).__name__,
+        "checked_out": pool_usage["checked_out"],
+        "peak_checked_out": pool_usage["peak_checked_out"],
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    return status
+
 # Async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
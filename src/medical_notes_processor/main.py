@@ -1,10 +1,22 @@
 from contextlib import asynccontextmanager
+from pathlib import Path
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
+import sys
 
+from sqlalchemy import select
+import uvicorn
+
+from .agents.extraction_agent import openai_client
+from .core.cache import close_cache
 from .core.config import settings
-from .db.base import init_db
+from .db.base import AsyncSessionLocal, engine, init_db
+from .models.document import Document
+from .services.rag_service import get_rag_service
+from .utils.external_apis import external_api_client
 from .api import health, documents, llm, rag, agent, fhir, chat
 
 # Configure logging
@@ -24,62 +36,68 @@ async def lifespan(app: FastAPI):
 
     # Auto-seed database with example notes if empty
     try:
-        from pathlib import Path
-        from sqlalchemy import select, func
-        from .db.base import AsyncSessionLocal
-        from .models.document import Document
-
         async with AsyncSessionLocal() as session:
-            result = await session.execute(select(func.count(Document.id)))
-            count = result.scalar()
+            # Only need to know whether any row exists, not how many
+            result = await session.execute(select(Document.id).limit(1))
+            existing = result.first()
 
-            if count == 0:
+            if existing is None:
                 logger.info("Database is empty. Seeding with example SOAP notes...")
                 example_notes_dir = Path(__file__).resolve().parent.parent.parent / "example_notes"
 
                 if example_notes_dir.exists():
                     soap_files = sorted(example_notes_dir.glob("soap_*.txt"))
-                    for soap_file in soap_files:
-                        content = soap_file.read_text()
-                        title = f"Medical Note - {soap_file.stem.replace('soap_', 'Case ')}"
-                        document = Document(title=title, content=content)
-                        session.add(document)
-                        logger.info(f"Added: {title}")
-
+                    # Read the files concurrently off the event loop
+                    contents = await asyncio.gather(
+                        *[asyncio.to_thread(soap_file.read_text) for soap_file in soap_files]
+                    )
+                    documents = [
+                        Document(
+                            title=f"Medical Note - {soap_file.stem.replace('soap_', 'Case ')}",
+                            content=content,
+                        )
+                        for soap_file, content in zip(soap_files, contents)
+                    ]
+                    session.add_all(documents)
                     await session.commit()
-                    logger.info(f"Successfully seeded {len(soap_files)} documents to SQL database")
+                    logger.info(f"Successfully seeded {len(documents)} documents to SQL database")
 
                     # Index documents in Qdrant vector store
                     try:
-                        from .services.rag_service import get_rag_service
-
-                        result = await session.execute(select(Document))
-                        documents = result.scalars().all()
+                        # Ids were populated on flush and the session does not expire
+                        # on commit, so the seeded objects are reused without a SELECT
                         doc_dicts = [
                             {"id": doc.id, "title": doc.title, "content": doc.content}
                             for doc in documents
                         ]
 
-                        await get_rag_service().index_documents(doc_dicts)
+                        rag_service = get_rag_service()
+                        async with rag_service.bulk_load():
+                            await rag_service.index_documents(doc_dicts)
                         logger.info(f"Successfully indexed {len(doc_dicts)} documents to Qdrant vector store")
                     except Exception as e:
                         logger.warning(f"Could not index documents to Qdrant (service may not be available): {str(e)}")
                 else:
                     logger.warning(f"Example notes directory not found: {example_notes_dir}")
             else:
-                logger.info(f"Database already has {count} documents")
+                logger.info("Database already has documents, skipping seed")
     except Exception as e:
         logger.error(f"Error during database seeding: {str(e)}")
 
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    await close_cache()
+    await openai_client.close()
+    await external_api_client.aclose()
+    await engine.dispose()
 
 
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -111,12 +129,16 @@ async def root():
 
 
 def main():
-    import uvicorn
+    # uvicorn[standard] installs uvloop and httptools; they are requested explicitly
+    # so a missing extra fails loudly instead of silently falling back to asyncio/h11
     uvicorn.run(
         "medical_notes_processor.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.debug,
+        loop="auto" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=1 if settings.debug else settings.workers,
     )
 
 
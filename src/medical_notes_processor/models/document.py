@@ -2,7 +2,7 @@ from datetime import datetime
 from sqlalchemy import String, Text, DateTime, Integer, Date
 from sqlalchemy.orm import Mapped, mapped_column
 from typing import Optional
-from ..db.base import Base
+from ..db.base import Base, utcnow
 
 
 class Document(Base):
@@ -10,15 +10,22 @@ class Document(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
-    content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Notes can be large; load content only where it is used (undefer / column selects)
+    content: Mapped[str] = mapped_column(Text, nullable=False, deferred=True)
     patient_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     encounter_date: Mapped[Optional[datetime]] = mapped_column(Date, nullable=True)
+    # Timestamps are filled in by the database (naive UTC); eager_defaults fetches
+    # them back (via RETURNING) during flush, so they are readable without a lazy
+    # load. Databases created before these defaults existed need
+    # scripts/migrate_timestamp_defaults.py.
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=utcnow(), nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+        DateTime, server_default=utcnow(), onupdate=utcnow(), nullable=False
     )
 
+    __mapper_args__ = {"eager_defaults": True}
+
     def __repr__(self) -> str:
         return f"<Document(id={self.id}, title='{self.title}')>"
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db.base import Base, utcnow
+
+
+class MigrationProgress(Base):
+    """Documents already handled by the metadata migration (its restart checkpoint)."""
+
+    __tablename__ = "migration_progress"
+
+    doc_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Filled in by the database (current UTC time), like Document's timestamps;
+    # tables created before this default need scripts/migrate_timestamp_defaults.py
+    processed_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=utcnow(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<MigrationProgress(doc_id={self.doc_id})>"
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List
+from typing_extensions import NotRequired, TypedDict
 
 
 # Document Schemas
@@ -23,6 +24,18 @@ class DocumentResponse(DocumentBase):
     model_config = {"from_attributes": True}
 
 
+class DocumentBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=100, description="IDs of the documents to fetch")
+
+
+class DocumentSummary(BaseModel):
+    """Document listing entry without the note content."""
+    id: int
+    title: str
+    patient_name: Optional[str] = None
+    encounter_date: Optional[datetime] = None
+
+
 # LLM Schemas
 class SummarizeRequest(BaseModel):
     text: str = Field(..., description="Medical note text to summarize")
@@ -38,9 +51,22 @@ class QuestionRequest(BaseModel):
     question: str = Field(..., min_length=1)
 
 
+class SourceRef(BaseModel):
+    """Retrieved chunk backing a RAG answer."""
+    model_config = ConfigDict(frozen=True)
+
+    document_id: Optional[int] = None
+    title: Optional[str] = None
+    chunk_index: Optional[int] = None
+    content_preview: Optional[str] = None
+    relevance_score: Optional[float] = None
+
+
 class QuestionResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     answer: str
-    sources: Optional[List[Dict[str, Any]]] = None
+    sources: Optional[List[SourceRef]] = None
 
 
 # Agent Schemas - Structured Medical Data
@@ -114,6 +140,44 @@ class ExtractStructuredResponse(BaseModel):
 
 
 # FHIR Schemas
+# Nested FHIR datatypes are TypedDicts: they validate against a fixed shape
+# but stay plain dicts, which is how FHIR JSON is consumed downstream.
+class FHIRCoding(TypedDict):
+    system: str
+    code: str
+    display: str
+
+
+class FHIRCodeableConcept(TypedDict):
+    text: str
+    coding: NotRequired[List[FHIRCoding]]
+
+
+class FHIRReference(TypedDict):
+    reference: str
+
+
+class FHIRQuantity(TypedDict):
+    value: str
+    unit: str
+
+
+class FHIRDosage(TypedDict):
+    text: str
+    route: Optional[FHIRCodeableConcept]
+
+
+class FHIRCarePlanActivityDetail(TypedDict):
+    kind: str
+    description: str
+    status: str
+    scheduledString: NotRequired[str]
+
+
+class FHIRCarePlanActivity(TypedDict):
+    detail: FHIRCarePlanActivityDetail
+
+
 class FHIRPatient(BaseModel):
     resourceType: str = "Patient"
     id: Optional[str] = None
@@ -127,23 +191,23 @@ class FHIRCondition(BaseModel):
     code: str
     clinicalStatus: Optional[str] = None
     verificationStatus: Optional[str] = None
-    subject: Optional[Dict[str, str]] = None
+    subject: Optional[FHIRReference] = None
     recordedDate: Optional[str] = None
 
 
 class FHIRMedication(BaseModel):
     resourceType: str = "MedicationRequest"
-    medicationCodeableConcept: Dict[str, Any]
-    subject: Optional[Dict[str, str]] = None
-    dosageInstruction: Optional[List[Dict[str, Any]]] = None
+    medicationCodeableConcept: FHIRCodeableConcept
+    subject: Optional[FHIRReference] = None
+    dosageInstruction: Optional[List[FHIRDosage]] = None
 
 
 class FHIRObservation(BaseModel):
     resourceType: str = "Observation"
-    code: Dict[str, Any]
+    code: FHIRCodeableConcept
     status: str = "final"
-    subject: Optional[Dict[str, str]] = None
-    valueQuantity: Optional[Dict[str, Any]] = None
+    subject: Optional[FHIRReference] = None
+    valueQuantity: Optional[FHIRQuantity] = None
     valueString: Optional[str] = None
 
 
@@ -151,8 +215,8 @@ class FHIRCarePlan(BaseModel):
     resourceType: str = "CarePlan"
     status: str = "active"
     intent: str = "plan"
-    subject: Optional[Dict[str, str]] = None
-    activity: Optional[List[Dict[str, Any]]] = None
+    subject: Optional[FHIRReference] = None
+    activity: Optional[List[FHIRCarePlanActivity]] = None
 
 
 class FHIRBundle(BaseModel):
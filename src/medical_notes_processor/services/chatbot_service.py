@@ -1,66 +1,272 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import asyncio
+import csv
+import hashlib
+import io
 import logging
-import httpx
 import re
 
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
+
+from ..agents.extraction_agent import extraction_agent
+from ..core.cache import document_cache_key, get_cache
 from ..core.config import settings
+from ..db.base import AsyncSessionLocal
+from ..models.document import Document
+from ..models.schemas import DocumentResponse, StructuredMedicalData
+from .fhir_service import fhir_service
+from .llm_service import llm_service
+from .rag_service import get_rag_service
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on documents fetched/extracted/summarized at once for a single message
+MAX_CONCURRENT_DOCUMENTS = 10
+
+# Only the most recent messages are consulted to resolve "it"/"them" references
+HISTORY_WINDOW_MESSAGES = 6
+
+T = TypeVar("T")
+
+# Words after which the following numbers are document IDs ("document 1 and 3",
+# "doc 2, 3, 4", "patient 1-3", "id 7"); a "#" prefix ("#5") works the same way
+_DOC_ID_KEYWORDS = frozenset({
+    "document", "documents", "doc", "docs", "patient", "patients",
+    "case", "cases", "note", "notes", "id",
+})
+# Tokens that may sit between IDs without ending the list
+_DOC_ID_CONNECTORS = frozenset({"and", "-"})
+_TOKEN_SPLIT_RE = re.compile(r"[^\w#-]+")
+
+
+# History messages are re-scanned on every follow-up turn ("what about it?"), so
+# parses are memoized by message text
+@lru_cache(maxsize=256)
+def _parse_document_ids(message: str) -> Tuple[int, ...]:
+    """Sorted, de-duplicated document IDs mentioned in message."""
+    # Single pass over the tokens: a keyword opens an ID list, which runs until
+    # the first token that is neither a number ("3", "1-3") nor a connector
+    doc_ids = []
+    in_id_list = False
+    for token in _TOKEN_SPLIT_RE.split(message.lower()):
+        if token in _DOC_ID_KEYWORDS:
+            in_id_list = True
+            continue
+        if "#" in token:
+            token = token.rpartition("#")[2]
+            in_id_list = True
+        if not in_id_list or not token or token in _DOC_ID_CONNECTORS:
+            continue
+        if token.isdigit():
+            doc_ids.append(int(token))
+            continue
+        parts = token.split("-")
+        if all(part.isdigit() for part in parts):
+            # Handles "1-3" (the endpoints, as before; not expanded into a range)
+            doc_ids.extend(int(part) for part in parts)
+        else:
+            in_id_list = False
+
+    return tuple(sorted(set(doc_ids)))
+
+
+def _content_key(text: str) -> bytes:
+    """Digest identifying a note's text for in-flight deduplication."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _keyword_re(*keywords: str) -> "re.Pattern[str]":
+    """
+    Case-insensitive pattern matching any keyword as a whole word, in one scan.
+
+    Whole-word matching keeps short keywords from firing inside other words
+    ("it" in "with", "code" in "decode", "table" in "tablets"), so inflected
+    forms that should match are listed explicitly.
+    """
+    alternation = "|".join(re.escape(keyword) for keyword in keywords)
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+
+# Requests for medical codes, plus format requests ("export", "csv", ...) that imply them
+_CODE_REQUEST_RE = _keyword_re(
+    "icd", "icd-10", "icd10", "diagnosis code", "diagnostic code",
+    "rxnorm", "medication code", "drug code", "ndc",
+    "cpt", "procedure code", "billing code",
+    "extract", "extracts", "extracted", "extraction",
+    "codes", "code", "coding",  # Added to catch "codes for doc X"
+    "export", "csv", "table", "list",
+)
+_SUMMARY_REQUEST_RE = _keyword_re(
+    "summarize", "summarise", "summarized", "summary", "summaries", "overview", "brief", "briefly",
+)
+# Explicit references to earlier documents ("it", "this patient", ...) and requests
+# that continue previous work ("export", "table", ...)
+_CONTEXT_REFERENCE_RE = _keyword_re(
+    "it", "its", "them", "that", "those", "these", "this document", "the document", "this patient", "the patient",
+    "export", "csv", "show", "display", "confidence", "detailed", "table", "list",
+)
+
+# Output formats for code extraction results, and the "all documents" request
+_CSV_FORMAT_RE = _keyword_re("csv", "export")
+_LIST_FORMAT_RE = _keyword_re("list", "detailed")
+_TABLE_FORMAT_RE = _keyword_re("table")
+_ALL_DOCUMENTS_RE = _keyword_re("all")
+
+
+# Messages that need no retrieval: whole-message small talk, and questions about which
+# documents exist (answered from the database by _get_documents_list)
+_SMALL_TALK_RE = re.compile(
+    r"^\s*(?:hi|hello|hey|thanks|thank you|ok|okay|help)\b[\s!.?]*$", re.IGNORECASE
+)
+_DOCUMENT_INVENTORY_RE = _keyword_re(
+    "what documents", "which documents", "available documents", "documents do you have",
+    "what notes", "which notes", "notes do you have",
+)
+
+_DOCUMENT_LIST_HEADER = (
+    "Available medical documents:\n\n"
+    "| ID | Document Title | Patient Name | Date |\n"
+    "|----|----------------|--------------|------|"
+)
+_DOCUMENT_LIST_FOOTER = "\nTo extract ICD-10 codes or medications, ask about specific documents by ID."
+
+# Placed between the per-document sections of a multi-document answer
+_DOC_SEPARATOR = "\n\n" + "=" * 50 + "\n\n"
+
+_TABLE_HEADER = (
+    "| Case | Document Title | Diagnoses | ICD-10 (AI) | Confidence | ICD-10 (Validated) | Medications | RxNorm |\n"
+    "|------|---------------|-----------|-------------|------------|-------------------|-------------|--------|"
+)
+
+# Row templates for _format_as_table; continuation rows leave the case columns blank
+_ROW_NO_DATA = "\n| {doc_id} | {title} | No data | - | - | - | - | - |"
+_ROW_NONE_FOUND = "\n| {doc_id} | {title} | None found | - | - | - | None found | - |"
+_ROW_FIRST = "\n| {doc_id} | {title} | {condition} | {medication} |"
+_ROW_MEDICATIONS_ONLY = "\n| {doc_id} | {title} | - | - | - | {medication} |"
+_ROW_CONDITION = "\n|  |  | {condition} |  |  |"
+_ROW_MEDICATION = "\n|  |  |  |  |  | {medication} |"
+
+
+# Table labels for the extraction confidence levels; anything else shows as "-"
+_CONFIDENCE_LABELS = {"HIGH": "HIGH", "MEDIUM": "MED", "LOW": "LOW"}
+
+
+# Extracted data is dumped from the pydantic models, so unset fields are present
+# as None; the formatters below therefore default with `or`, not .get(key, default)
+def _condition_cells(cond: Dict[str, Any]) -> str:
+    """Diagnosis, AI code, confidence and validated code cells for one table row."""
+    confidence = cond.get("confidence")
+    conf_display = _CONFIDENCE_LABELS.get(confidence.upper(), "-") if confidence else "-"
+    return (
+        f"{cond.get('name') or 'Unknown'} | {cond.get('ai_icd10_code') or 'N/A'} | "
+        f"{conf_display} | {cond.get('validated_icd10_code') or 'N/A'}"
+    )
+
+
+def _medication_cells(med: Dict[str, Any]) -> str:
+    """Medication name and RxNorm code cells for one table row."""
+    return f"{med.get('name') or 'Unknown'} | {med.get('rxnorm_code') or 'N/A'}"
+
 
 class MedicalChatbot:
     """
     Fast hybrid chatbot for medical notes.
 
     Uses direct LLM calls for speed, with smart extraction when medical codes are requested.
+    Tools call the service layer in-process rather than going back through the
+    HTTP API, so no request is serialized, sent over loopback and re-validated.
+
+    Document fetches, extractions and summaries already running for the same
+    document or note text are shared rather than started again, so overlapping
+    turns (or an "all" request overlapping a single-document one) do the work once.
     """
 
     def __init__(self):
-        """Initialize chatbot with OpenAI LLM."""
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            api_key=settings.openai_api_key,
-            temperature=0.0,
-        )
-        self.api_base = "http://localhost:8000"
+        self._inflight: Dict[Tuple[str, Any], "asyncio.Task[Any]"] = {}
+
+    async def _coalesce(self, key: Tuple[str, Any], factory: Callable[[], Awaitable[T]]) -> T:
+        """Await the in-flight call for key, starting it with factory if there is none."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller being cancelled does not cancel the call for the others
+        return await asyncio.shield(task)
 
     async def _get_document(self, doc_id: int) -> Optional[Dict[str, Any]]:
-        """Fetch document by ID."""
+        """
+        Fetch document by ID.
+
+        Conversations keep referring back to the same documents, so fetched
+        documents are kept in the shared cache for settings.document_cache_ttl
+        seconds (deleting a document evicts it).
+        """
+        return await self._coalesce(("document", doc_id), lambda: self._fetch_document(doc_id))
+
+    async def _fetch_document(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        cache_key = document_cache_key(doc_id)
+        # Cache failures (e.g. Redis down) fall through to the database
+        try:
+            cached = await get_cache().get(cache_key)
+            if cached is not None:
+                return orjson.loads(cached)
+        except Exception as e:
+            logger.warning(f"Document cache read failed: {str(e)}")
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.api_base}/documents/{doc_id}")
-                if response.status_code == 200:
-                    return response.json()
+            async with AsyncSessionLocal() as session:
+                document = await session.get(Document, doc_id, options=[undefer(Document.content)])
+                if document is None:
+                    return None
+                doc = DocumentResponse.model_validate(document).model_dump(mode="json")
         except Exception as e:
             logger.error(f"Error fetching document {doc_id}: {str(e)}")
-        return None
+            return None
+
+        try:
+            await get_cache().set(cache_key, orjson.dumps(doc).decode(), ttl=settings.document_cache_ttl)
+        except Exception as e:
+            logger.warning(f"Document cache write failed: {str(e)}")
+        return doc
+
+    async def _get_all_documents(self) -> List[Dict[str, Any]]:
+        """Fetch every document, with content, in a single query."""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Document).options(undefer(Document.content)))
+            return [
+                DocumentResponse.model_validate(document).model_dump(mode="json")
+                for document in result.scalars()
+            ]
 
     async def _extract_codes(self, text: str) -> Optional[Dict[str, Any]]:
         """Extract ICD-10/RxNorm codes from text."""
+        return await self._coalesce(("extract", _content_key(text)), lambda: self._run_extraction(text))
+
+    async def _run_extraction(self, text: str) -> Optional[Dict[str, Any]]:
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self.api_base}/extract_structured",
-                    json={"text": text}
-                )
-                if response.status_code == 200:
-                    return response.json().get("structured_data", {})
+            structured = await extraction_agent.extract_structured_data(text)
+            return structured.model_dump(mode="json")
         except Exception as e:
             logger.error(f"Error extracting codes: {str(e)}")
         return None
 
+    async def _convert_to_fhir(self, structured: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert extracted structured data to a FHIR bundle."""
+        bundle = fhir_service.convert_to_fhir(StructuredMedicalData.model_validate(structured))
+        return bundle.model_dump(mode="json")
+
     async def _summarize_note(self, text: str) -> str:
         """Generate summary of medical note."""
+        return await self._coalesce(("summary", _content_key(text)), lambda: self._run_summary(text))
+
+    async def _run_summary(self, text: str) -> str:
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self.api_base}/summarize_note",
-                    json={"text": text}
-                )
-                if response.status_code == 200:
-                    return response.json().get("summary", "No summary generated")
+            result = await llm_service.summarize_medical_note(text)
+            return result.get("summary") or "No summary generated"
         except Exception as e:
             logger.error(f"Error summarizing note: {str(e)}")
         return "Failed to generate summary"
@@ -68,69 +274,53 @@ class MedicalChatbot:
     async def _rag_search(self, query: str, top_k: int = 3) -> Optional[Dict[str, Any]]:
         """Search documents using RAG."""
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self.api_base}/answer_question",
-                    json={"question": query, "top_k": top_k}
-                )
-                if response.status_code == 200:
-                    return response.json()
+            return await get_rag_service().answer_question(query, top_k=top_k)
         except Exception as e:
             logger.error(f"Error in RAG search: {str(e)}")
         return None
 
+    async def _get_document_with_codes(
+        self, doc_id: int, extraction_cache: dict
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Fetch a document and its extracted codes, reusing the session's extraction cache."""
+        doc = await self._get_document(doc_id)
+        if not doc:
+            return None, None
+        return doc, await self._get_codes(doc, extraction_cache)
+
+    async def _get_codes(self, doc: Dict[str, Any], extraction_cache: dict) -> Optional[Dict[str, Any]]:
+        """Extracted codes for a fetched document, reusing the session's extraction cache."""
+        if doc["id"] not in extraction_cache:
+            extraction_cache[doc["id"]] = await self._extract_codes(doc["content"])
+        return extraction_cache[doc["id"]]
+
+    async def _map_documents(
+        self, doc_ids: List[int], handler: Callable[[int], Awaitable[T]]
+    ) -> List[T]:
+        """Run handler for every document concurrently, returning results in doc_ids order."""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOCUMENTS)
+
+        async def run(doc_id: int) -> T:
+            async with semaphore:
+                return await handler(doc_id)
+
+        return await asyncio.gather(*(run(doc_id) for doc_id in doc_ids))
+
     def _needs_code_extraction(self, message: str) -> bool:
         """Check if message is asking for medical codes."""
-        code_keywords = [
-            "icd", "icd-10", "icd10", "diagnosis code", "diagnostic code",
-            "rxnorm", "medication code", "drug code", "ndc",
-            "cpt", "procedure code", "billing code", "extract",
-            "codes", "code"  # Added to catch "codes for doc X"
-        ]
-        message_lower = message.lower()
-
-        # Also check if it's a format request that implies code extraction
-        format_keywords = ["export", "csv", "table", "list"]
-        if any(fmt in message_lower for fmt in format_keywords):
-            # These format requests should trigger code extraction
-            return True
-
-        return any(keyword in message_lower for keyword in code_keywords)
+        return _CODE_REQUEST_RE.search(message) is not None
 
     def _needs_summarization(self, message: str) -> bool:
         """Check if message is asking for a summary."""
-        summary_keywords = ["summarize", "summary", "overview", "brief"]
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in summary_keywords)
+        return _SUMMARY_REQUEST_RE.search(message) is not None
+
+    def _needs_rag(self, message: str) -> bool:
+        """Check if answering the message needs a RAG search over the documents."""
+        return not (_SMALL_TALK_RE.match(message) or _DOCUMENT_INVENTORY_RE.search(message))
 
     def _extract_document_ids(self, message: str) -> list:
         """Extract document IDs from message (e.g., 'document 1', 'doc 3', 'patient 2 and 3')."""
-        import re
-
-        # Match patterns like "document 1 and 3", "doc 2, 3, 4", "patient 1-3", etc.
-        patterns = [
-            r'documents?\s+([\d\s,and-]+)',
-            r'docs?\s+([\d\s,and-]+)',
-            r'patients?\s+([\d\s,and-]+)',
-            r'cases?\s+([\d\s,and-]+)',
-            r'notes?\s+([\d\s,and-]+)',
-            r'\bid\s+([\d\s,and-]+)',
-            r'#([\d\s,and-]+)',
-        ]
-
-        doc_ids = []
-        message_lower = message.lower()
-
-        for pattern in patterns:
-            matches = re.findall(pattern, message_lower)
-            for match in matches:
-                # Extract all numbers from the matched string
-                # Handles "2 and 3", "2, 3, 4", "1-3", etc.
-                numbers = re.findall(r'\d+', match)
-                doc_ids.extend([int(n) for n in numbers])
-
-        # Remove duplicates and sort
-        return sorted(set(doc_ids))
+        return list(_parse_document_ids(message))
 
     async def chat(self, user_message: str, note_id: Optional[int] = None, conversation_history: list = None, extraction_cache: dict = None) -> str:
         """
@@ -146,29 +336,24 @@ class MedicalChatbot:
         Args:
             user_message: The user's question
             note_id: Optional specific document ID
-            conversation_history: Previous messages for context
+            conversation_history: Previous messages for context; only the last
+                HISTORY_WINDOW_MESSAGES are used, so callers need not keep more
             extraction_cache: Dict to cache extracted data {doc_id: structured_data}
         """
         try:
-            conversation_history = conversation_history or []
-            extraction_cache = extraction_cache or {}
+            conversation_history = (conversation_history or [])[-HISTORY_WINDOW_MESSAGES:]
+            extraction_cache = {} if extraction_cache is None else extraction_cache
 
             # Auto-detect document IDs from current message
             doc_ids = self._extract_document_ids(user_message)
+            message_lower = user_message.lower()
 
             # If no IDs found and user has conversation history, try to infer from context
             if not doc_ids and conversation_history:
-                # Explicit context references
-                context_words = ["it", "them", "that", "those", "these", "this document", "the document", "this patient", "the patient"]
-                has_context_word = any(phrase in user_message.lower() for phrase in context_words)
-
-                # Also check for requests that suggest continuing previous work
-                continuation_keywords = ["export", "csv", "show", "display", "confidence", "detailed", "table", "list"]
-                is_continuation = any(keyword in user_message.lower() for keyword in continuation_keywords)
-
-                if has_context_word or is_continuation:
+                # Context references ("it", "this patient") or continuation of previous work
+                if _CONTEXT_REFERENCE_RE.search(user_message):
                     # Look back through conversation to find previously mentioned documents
-                    for msg in reversed(conversation_history[-6:]):  # Look back up to 6 messages
+                    for msg in reversed(conversation_history):
                         # Check both user and assistant messages
                         msg_content = msg.get("content", "")
                         found_ids = self._extract_document_ids(msg_content)
@@ -180,93 +365,61 @@ class MedicalChatbot:
                 doc_ids = [note_id]
 
             # Handle FHIR conversion requests
-            if "fhir" in user_message.lower() and doc_ids:
-                results = []
-                for doc_id in doc_ids:
-                    # Check cache first
-                    if doc_id in extraction_cache:
-                        structured = extraction_cache[doc_id]
-                    else:
-                        doc = await self._get_document(doc_id)
-                        if doc:
-                            structured = await self._extract_codes(doc["content"])
-                            extraction_cache[doc_id] = structured
-                        else:
-                            results.append(f"Document {doc_id}: Not found")
-                            continue
-
-                    if structured:
-                        # Convert to FHIR
-                        try:
-                            async with httpx.AsyncClient(timeout=300.0) as client:
-                                response = await client.post(
-                                    f"{self.api_base}/to_fhir",
-                                    json={"structured_data": structured}
-                                )
-                                if response.status_code == 200:
-                                    fhir_data = response.json().get("fhir_bundle", {})
-                                    doc = await self._get_document(doc_id)
-                                    results.append(f"**FHIR Bundle for {doc['title']}**\n\n```json\n{self._format_fhir(fhir_data)}\n```")
-                                else:
-                                    results.append(f"Document {doc_id}: FHIR conversion failed")
-                        except Exception as e:
-                            logger.error(f"Error converting to FHIR: {str(e)}")
-                            results.append(f"Document {doc_id}: Error converting to FHIR")
-                    else:
-                        results.append(f"Document {doc_id}: No structured data available")
-
-                return "\n\n" + "="*50 + "\n\n".join(results)
+            if "fhir" in message_lower and doc_ids:
+                async def convert_one(doc_id):
+                    doc, structured = await self._get_document_with_codes(doc_id, extraction_cache)
+                    if not doc:
+                        return f"Document {doc_id}: Not found"
+                    if not structured:
+                        return f"Document {doc_id}: No structured data available"
+                    try:
+                        fhir_data = await self._convert_to_fhir(structured)
+                        return f"**FHIR Bundle for {doc['title']}**\n\n```json\n{self._format_fhir(fhir_data)}\n```"
+                    except Exception as e:
+                        logger.error(f"Error converting to FHIR: {str(e)}")
+                        return f"Document {doc_id}: Error converting to FHIR"
+
+                results = await self._map_documents(doc_ids, convert_one)
+                return _DOC_SEPARATOR.join(results)
 
             # Handle vital signs requests
-            if "vital" in user_message.lower() and doc_ids:
-                results = []
-                for doc_id in doc_ids:
-                    # Check cache first
-                    if doc_id in extraction_cache:
-                        structured = extraction_cache[doc_id]
-                    else:
-                        doc = await self._get_document(doc_id)
-                        if doc:
-                            structured = await self._extract_codes(doc["content"])
-                            extraction_cache[doc_id] = structured
-                        else:
-                            results.append(f"Document {doc_id}: Not found")
-                            continue
-
-                    if structured and "vital_signs" in structured:
-                        vitals = structured["vital_signs"]
-                        doc = await self._get_document(doc_id)
-                        result = f"**Vital Signs from {doc['title']}**\n\n"
-                        if vitals.get("blood_pressure"):
-                            result += f"Blood Pressure: {vitals['blood_pressure']}\n"
-                        if vitals.get("heart_rate"):
-                            result += f"Heart Rate: {vitals['heart_rate']}\n"
-                        if vitals.get("temperature"):
-                            result += f"Temperature: {vitals['temperature']}\n"
-                        if vitals.get("respiratory_rate"):
-                            result += f"Respiratory Rate: {vitals['respiratory_rate']}\n"
-                        if vitals.get("oxygen_saturation"):
-                            result += f"Oxygen Saturation: {vitals['oxygen_saturation']}\n"
-                        results.append(result)
-                    else:
-                        results.append(f"Document {doc_id}: No vital signs found")
-
-                return "\n\n" + "="*50 + "\n\n".join(results)
+            if "vital" in message_lower and doc_ids:
+                async def vitals_one(doc_id):
+                    doc, structured = await self._get_document_with_codes(doc_id, extraction_cache)
+                    if not doc:
+                        return f"Document {doc_id}: Not found"
+                    if not (structured and "vital_signs" in structured):
+                        return f"Document {doc_id}: No vital signs found"
+                    vitals = structured["vital_signs"]
+                    result = f"**Vital Signs from {doc['title']}**\n\n"
+                    if vitals.get("blood_pressure"):
+                        result += f"Blood Pressure: {vitals['blood_pressure']}\n"
+                    if vitals.get("heart_rate"):
+                        result += f"Heart Rate: {vitals['heart_rate']}\n"
+                    if vitals.get("temperature"):
+                        result += f"Temperature: {vitals['temperature']}\n"
+                    if vitals.get("respiratory_rate"):
+                        result += f"Respiratory Rate: {vitals['respiratory_rate']}\n"
+                    if vitals.get("oxygen_saturation"):
+                        result += f"Oxygen Saturation: {vitals['oxygen_saturation']}\n"
+                    return result
+
+                results = await self._map_documents(doc_ids, vitals_one)
+                return _DOC_SEPARATOR.join(results)
 
             # Handle summarization requests
             if self._needs_summarization(user_message):
                 if doc_ids:
-                    # Summarize specified documents
-                    summaries = []
-                    for doc_id in doc_ids:
+                    # Summarize specified documents concurrently
+                    async def summarize_one(doc_id):
                         doc = await self._get_document(doc_id)
-                        if doc:
-                            summary = await self._summarize_note(doc["content"])
-                            summaries.append(f"**{doc['title']}**\n\n{summary}")
-                        else:
-                            summaries.append(f"Document {doc_id}: Not found")
+                        if not doc:
+                            return f"Document {doc_id}: Not found"
+                        summary = await self._summarize_note(doc["content"])
+                        return f"**{doc['title']}**\n\n{summary}"
 
-                    return "\n\n" + "="*50 + "\n\n".join(summaries)
+                    summaries = await self._map_documents(doc_ids, summarize_one)
+                    return _DOC_SEPARATOR.join(summaries)
                 else:
                     return "Please specify which document to summarize (e.g., 'summarize document 1')."
 
@@ -274,9 +427,9 @@ class MedicalChatbot:
             if self._needs_code_extraction(user_message):
                 if doc_ids:
                     # Determine output format
-                    wants_csv = "csv" in user_message.lower() or "export" in user_message.lower()
-                    wants_list = "list" in user_message.lower() or "detailed" in user_message.lower()
-                    wants_table = "table" in user_message.lower()
+                    wants_csv = bool(_CSV_FORMAT_RE.search(user_message))
+                    wants_list = bool(_LIST_FORMAT_RE.search(user_message))
+                    wants_table = bool(_TABLE_FORMAT_RE.search(user_message))
 
                     # Smart defaults if no format specified
                     if not wants_csv and not wants_list and not wants_table:
@@ -284,65 +437,30 @@ class MedicalChatbot:
                         wants_table = len(doc_ids) > 1
                         wants_list = len(doc_ids) == 1
 
-                    # Extract codes from all specified documents
+                    # Extract codes from all specified documents concurrently
+                    extracted = await self._map_documents(
+                        doc_ids, lambda doc_id: self._get_document_with_codes(doc_id, extraction_cache)
+                    )
+
                     results = []
                     table_data = []  # For structured formats (table/CSV)
+                    for doc_id, (doc, structured) in zip(doc_ids, extracted):
+                        if not doc:
+                            if wants_list:
+                                results.append(f"Document {doc_id}: Not found")
+                            continue
 
-                    for doc_id in doc_ids:
-                        # Check cache first
-                        logger.info(f"Processing doc_id={doc_id}, cache keys={list(extraction_cache.keys())}, in_cache={doc_id in extraction_cache}")
-                        if doc_id in extraction_cache:
-                            logger.info(f"Using cached extraction for doc_id={doc_id}")
-                            structured = extraction_cache[doc_id]
-                            doc = await self._get_document(doc_id)
-                            if doc:
-                                # Use cached structured data
-                                if structured:
-                                    table_data.append({
-                                        "doc_id": doc_id,
-                                        "title": doc["title"],
-                                        "structured": structured
-                                    })
-                                    if wants_list:
-                                        results.append(self._format_structured_data(structured, doc["title"]))
-                                else:
-                                    table_data.append({
-                                        "doc_id": doc_id,
-                                        "title": doc["title"],
-                                        "structured": None
-                                    })
-                                    if wants_list:
-                                        results.append(f"Document {doc_id}: No structured data extracted")
-                        else:
-                            # Not in cache - extract and cache
-                            logger.info(f"Cache MISS for doc_id={doc_id}, extracting from scratch")
-                            doc = await self._get_document(doc_id)
-                            if doc:
-                                structured = await self._extract_codes(doc["content"])
-                                # Store in cache for future requests
-                                extraction_cache[doc_id] = structured
-                                logger.info(f"Cached extraction for doc_id={doc_id}")
-
-                                if structured:
-                                    # Always collect for table_data (used by both table and CSV)
-                                    table_data.append({
-                                        "doc_id": doc_id,
-                                        "title": doc["title"],
-                                        "structured": structured
-                                    })
-                                    if wants_list:
-                                        results.append(self._format_structured_data(structured, doc["title"]))
-                                else:
-                                    table_data.append({
-                                        "doc_id": doc_id,
-                                        "title": doc["title"],
-                                        "structured": None
-                                    })
-                                    if wants_list:
-                                        results.append(f"Document {doc_id}: No structured data extracted")
+                        # Always collect for table_data (used by both table and CSV)
+                        table_data.append({
+                            "doc_id": doc_id,
+                            "title": doc["title"],
+                            "structured": structured or None
+                        })
+                        if wants_list:
+                            if structured:
+                                results.append(self._format_structured_data(structured, doc["title"]))
                             else:
-                                if wants_list:
-                                    results.append(f"Document {doc_id}: Not found")
+                                results.append(f"Document {doc_id}: No structured data extracted")
 
                     # Return in requested format
                     if wants_csv and table_data:
@@ -354,7 +472,7 @@ class MedicalChatbot:
                         footer = "\n\n**Tip**: You can also ask for:\n- 'detailed list' for more information with reasoning\n- 'export to CSV' for spreadsheet format"
                         return table_output + footer
 
-                    results_output = "\n\n" + "="*50 + "\n\n".join(results) if results else "No documents processed."
+                    results_output = _DOC_SEPARATOR.join(results) if results else "No documents processed."
                     # Add helpful footer for list format
                     if len(doc_ids) > 1:
                         footer = "\n\n**Tip**: Try asking for 'in a table' to compare documents side-by-side"
@@ -362,41 +480,27 @@ class MedicalChatbot:
                     return results_output
                 else:
                     # Extract from all documents if "all" is mentioned
-                    if "all" in user_message.lower():
-                        async with httpx.AsyncClient() as client:
-                            response = await client.get(f"{self.api_base}/documents")
-                            if response.status_code == 200:
-                                all_ids = response.json()
-                                results = []
-
-                                # Process all documents in parallel for speed
-                                import asyncio
-                                async def extract_one(doc_id):
-                                    # Check cache first
-                                    if doc_id in extraction_cache:
-                                        structured = extraction_cache[doc_id]
-                                        doc = await self._get_document(doc_id)
-                                        if doc and structured:
-                                            return self._format_structured_data(structured, doc["title"])
-                                    else:
-                                        # Not in cache - extract and cache
-                                        doc = await self._get_document(doc_id)
-                                        if doc:
-                                            structured = await self._extract_codes(doc["content"])
-                                            extraction_cache[doc_id] = structured
-                                            if structured:
-                                                return self._format_structured_data(structured, doc["title"])
-                                    return None
-
-                                results = await asyncio.gather(*[extract_one(doc_id) for doc_id in all_ids])
-                                results = [r for r in results if r]  # Filter out None values
-
-                                return "\n\n" + "="*50 + "\n\n".join(results) if results else "No data extracted."
+                    if _ALL_DOCUMENTS_RE.search(user_message):
+                        # One query for every document rather than a fetch per ID
+                        docs_by_id = {doc["id"]: doc for doc in await self._get_all_documents()}
+
+                        async def extract_one(doc_id):
+                            doc = docs_by_id[doc_id]
+                            structured = await self._get_codes(doc, extraction_cache)
+                            if structured:
+                                return self._format_structured_data(structured, doc["title"])
+                            return None
+
+                        results = await self._map_documents(list(docs_by_id), extract_one)
+                        results = [r for r in results if r]  # Filter out None values
+
+                        return _DOC_SEPARATOR.join(results) if results else "No data extracted."
 
                     return "Please specify a document ID (e.g., 'document 1') or say 'all patients' to extract codes from all documents."
 
-            # Handle general questions with RAG
-            rag_result = await self._rag_search(user_message)
+            # Handle general questions with RAG; greetings and "what documents do you
+            # have" are answered from the document list without a retrieval round-trip
+            rag_result = await self._rag_search(user_message) if self._needs_rag(user_message) else None
             if rag_result:
                 answer = rag_result.get("answer", "")
                 sources = rag_result.get("sources", [])
@@ -406,7 +510,7 @@ class MedicalChatbot:
                 if sources:
                     response_parts.append("\n\nSources:")
                     for src in sources:
-                        response_parts.append(f"- Document {src['document_id']}: {src['title']}")
+                        response_parts.append(f"- Document {src.document_id}: {src.title}")
 
                 return "\n".join(response_parts)
 
@@ -420,39 +524,22 @@ class MedicalChatbot:
     async def _get_documents_list(self) -> str:
         """Get formatted list of all documents as a table with patient name and date."""
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.get(f"{self.api_base}/documents")
-                if response.status_code == 200:
-                    doc_ids = response.json()
-
-                    # Fetch details for each document
-                    docs_info = []
-                    for doc_id in doc_ids:
-                        doc_response = await client.get(f"{self.api_base}/documents/{doc_id}")
-                        if doc_response.status_code == 200:
-                            doc = doc_response.json()
-                            patient_name = doc.get('patient_name') or "-"
-                            encounter_date = doc.get('encounter_date') or "-"
-                            if encounter_date != "-" and isinstance(encounter_date, str):
-                                # Format date nicely if it exists
-                                try:
-                                    from datetime import datetime as dt
-                                    date_obj = dt.fromisoformat(encounter_date.replace('Z', '+00:00'))
-                                    encounter_date = date_obj.strftime("%Y-%m-%d")
-                                except:
-                                    pass
-                            docs_info.append((doc['id'], doc['title'], patient_name, encounter_date))
-
-                    if docs_info:
-                        # Format as table
-                        lines = ["Available medical documents:\n"]
-                        lines.append("| ID | Document Title | Patient Name | Date |")
-                        lines.append("|----|----------------|--------------|------|")
-                        for doc_id, title, patient, date in docs_info:
-                            lines.append(f"| {doc_id} | {title} | {patient} | {date} |")
-                        lines.append("\nTo extract ICD-10 codes or medications, ask about specific documents by ID.")
-                        return "\n".join(lines)
-                    return "No documents found."
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(Document.id, Document.title, Document.patient_name, Document.encounter_date)
+                    .order_by(Document.id)
+                )
+                rows = result.all()
+
+            if rows:
+                # Format as table
+                body = "\n".join(
+                    f"| {doc_id} | {title} | {patient_name or '-'} | "
+                    f"{encounter_date.strftime('%Y-%m-%d') if encounter_date else '-'} |"
+                    for doc_id, title, patient_name, encounter_date in rows
+                )
+                return f"{_DOCUMENT_LIST_HEADER}\n{body}\n{_DOCUMENT_LIST_FOOTER}"
+            return "No documents found."
         except Exception as e:
             logger.error(f"Error listing documents: {str(e)}")
 
@@ -463,71 +550,64 @@ class MedicalChatbot:
         if not table_data:
             return "No data to export"
 
-        lines = []
-        # CSV header
-        lines.append("Case,Document Title,Diagnosis,ICD-10 (AI),Confidence,ICD-10 (Validated),Medication,RxNorm,Code Reasoning")
+        buf = io.StringIO()
+        # csv.writer quotes fields containing commas, quotes or newlines
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow([
+            "Case", "Document Title", "Diagnosis", "ICD-10 (AI)", "Confidence",
+            "ICD-10 (Validated)", "Medication", "RxNorm", "Code Reasoning",
+        ])
 
         for item in table_data:
             doc_id = item["doc_id"]
-            title = item["title"].replace(",", ";")  # Escape commas in title
+            title = item["title"]
             structured = item["structured"]
 
             if not structured:
-                lines.append(f'{doc_id},{title},No data,-,-,-,-,-,-')
+                writer.writerow([doc_id, title, "No data", "-", "-", "-", "-", "-", "-"])
                 continue
 
             conditions = structured.get("diagnoses") or structured.get("conditions") or []
             medications = structured.get("medications") or []
 
             if not conditions and not medications:
-                lines.append(f'{doc_id},{title},None found,-,-,-,None found,-,-')
+                writer.writerow([doc_id, title, "None found", "-", "-", "-", "None found", "-", "-"])
                 continue
 
-            # Export all conditions and medications
-            max_items = max(len(conditions), len(medications))
-
-            for i in range(max_items):
-                # Condition data
+            # Export all conditions and medications; only the first row names the document
+            for i in range(max(len(conditions), len(medications))):
                 if i < len(conditions):
                     cond = conditions[i]
-                    diag_name = cond.get("name", "").replace(",", ";")
-                    ai_code = cond.get("ai_icd10_code", "N/A")
-                    validated_code = cond.get("validated_icd10_code", "N/A")
-                    confidence = cond.get("confidence", "").upper()
-                    reasoning = cond.get("code_reasoning", "").replace(",", ";")
+                    condition_fields = [
+                        cond.get("name") or "",
+                        cond.get("ai_icd10_code") or "N/A",
+                        (cond.get("confidence") or "").upper(),
+                        cond.get("validated_icd10_code") or "N/A",
+                    ]
+                    reasoning = cond.get("code_reasoning") or ""
                 else:
-                    diag_name = ""
-                    ai_code = ""
-                    validated_code = ""
-                    confidence = ""
+                    condition_fields = ["", "", "", ""]
                     reasoning = ""
 
-                # Medication data
                 if i < len(medications):
                     med = medications[i]
-                    med_name = med.get("name", "").replace(",", ";")
-                    rx_code = med.get("rxnorm_code", "N/A")
+                    medication_fields = [med.get("name") or "", med.get("rxnorm_code") or "N/A"]
                 else:
-                    med_name = ""
-                    rx_code = ""
+                    medication_fields = ["", ""]
 
-                # Only include doc_id and title in first row
-                if i == 0:
-                    lines.append(f'{doc_id},{title},{diag_name},{ai_code},{confidence},{validated_code},{med_name},{rx_code},"{reasoning}"')
-                else:
-                    lines.append(f',,{diag_name},{ai_code},{confidence},{validated_code},{med_name},{rx_code},"{reasoning}"')
+                case_fields = [doc_id, title] if i == 0 else ["", ""]
+                writer.writerow(case_fields + condition_fields + medication_fields + [reasoning])
 
-        csv_content = "\n".join(lines)
-        return f"```csv\n{csv_content}\n```"
+        return f"```csv\n{buf.getvalue()}```"
 
     def _format_as_table(self, table_data: list) -> str:
         """Format multiple document results as a markdown table."""
         if not table_data:
             return "No data to display"
 
-        # Build table header with Confidence column
-        table = ["| Case | Document Title | Diagnoses | ICD-10 (AI) | Confidence | ICD-10 (Validated) | Medications | RxNorm |"]
-        table.append("|------|---------------|-----------|-------------|------------|-------------------|-------------|--------|")
+        buf = io.StringIO()
+        write = buf.write
+        write(_TABLE_HEADER)
 
         for item in table_data:
             doc_id = item["doc_id"]
@@ -535,7 +615,7 @@ class MedicalChatbot:
             structured = item["structured"]
 
             if not structured:
-                table.append(f"| {doc_id} | {title} | No data | - | - | - | - | - |")
+                write(_ROW_NO_DATA.format(doc_id=doc_id, title=title))
                 continue
 
             # Get conditions and medications
@@ -544,60 +624,28 @@ class MedicalChatbot:
 
             # If no conditions or meds, show empty row
             if not conditions and not medications:
-                table.append(f"| {doc_id} | {title} | None found | - | - | - | None found | - |")
+                write(_ROW_NONE_FOUND.format(doc_id=doc_id, title=title))
                 continue
 
-            # First row with doc info
-            first_row = True
-
-            # Process conditions
+            # The document's first row carries its first condition and first medication;
+            # the remaining conditions, then medications, follow as continuation rows
             if conditions:
-                for cond in conditions:
-                    name = cond.get("name", "Unknown")
-                    ai_code = cond.get("ai_icd10_code", "N/A")
-                    validated_code = cond.get("validated_icd10_code", "N/A")
-                    confidence = cond.get("confidence", "").upper()
-
-                    # Format confidence
-                    if confidence == "HIGH":
-                        conf_display = "HIGH"
-                    elif confidence == "MEDIUM":
-                        conf_display = "MED"
-                    elif confidence == "LOW":
-                        conf_display = "LOW"
-                    else:
-                        conf_display = "-"
-
-                    if first_row:
-                        # Include medications in first row if available
-                        if medications:
-                            med = medications[0]
-                            med_name = med.get("name", "Unknown")
-                            rx_code = med.get("rxnorm_code", "N/A")
-                            table.append(f"| {doc_id} | {title} | {name} | {ai_code} | {conf_display} | {validated_code} | {med_name} | {rx_code} |")
-                        else:
-                            table.append(f"| {doc_id} | {title} | {name} | {ai_code} | {conf_display} | {validated_code} | - | - |")
-                        first_row = False
-                    else:
-                        table.append(f"|  |  | {name} | {ai_code} | {conf_display} | {validated_code} |  |  |")
-
-            # Process remaining medications (if conditions already printed)
-            if medications and conditions:
-                start_idx = 1  # Skip first med if already printed
-            elif medications:
-                start_idx = 0
-
-            if medications:
-                for med in medications[start_idx:]:
-                    med_name = med.get("name", "Unknown")
-                    rx_code = med.get("rxnorm_code", "N/A")
-                    if first_row:
-                        table.append(f"| {doc_id} | {title} | - | - | - | {med_name} | {rx_code} |")
-                        first_row = False
-                    else:
-                        table.append(f"|  |  |  |  |  | {med_name} | {rx_code} |")
-
-        return "\n".join(table)
+                med_cells = _medication_cells(medications[0]) if medications else "- | -"
+                write(_ROW_FIRST.format(
+                    doc_id=doc_id, title=title,
+                    condition=_condition_cells(conditions[0]), medication=med_cells,
+                ))
+                for cond in conditions[1:]:
+                    write(_ROW_CONDITION.format(condition=_condition_cells(cond)))
+            else:
+                write(_ROW_MEDICATIONS_ONLY.format(
+                    doc_id=doc_id, title=title, medication=_medication_cells(medications[0]),
+                ))
+
+            for med in medications[1:]:
+                write(_ROW_MEDICATION.format(medication=_medication_cells(med)))
+
+        return buf.getvalue()
 
     def _format_structured_data(self, structured: Dict[str, Any], doc_title: str = "") -> str:
         """Format extracted structured data for display with dual code display."""
@@ -609,48 +657,44 @@ class MedicalChatbot:
         # Handle both "diagnoses" and "conditions" keys
         conditions = structured.get("diagnoses") or structured.get("conditions")
         if conditions:
-            # Separate AI-inferred and validated codes for clearer presentation
-            has_ai_codes = any(diag.get("ai_icd10_code") for diag in conditions)
-            has_validated_codes = any(diag.get("validated_icd10_code") for diag in conditions)
+            # Separate AI-inferred and validated codes for clearer presentation; both
+            # sections list every diagnosis, so build them together in one pass
+            ai_lines = ["Diagnoses (AI-Inferred Codes):"]
+            validated_lines = ["\nDiagnoses (API-Validated Codes):"]
+            has_ai_codes = has_validated_codes = False
+            for diag in conditions:
+                name = diag.get("name") or "Unknown"
+                ai_code = diag.get("ai_icd10_code")
+                validated_code = diag.get("validated_icd10_code")
+                has_ai_codes = has_ai_codes or bool(ai_code)
+                has_validated_codes = has_validated_codes or bool(validated_code)
+
+                line = f"  - {name} (ICD-10: {ai_code or 'Not assigned'})"
+                confidence = diag.get("confidence")
+                if confidence:
+                    line += f" [{confidence.upper()}]"
+                ai_lines.append(line)
+                reasoning = diag.get("code_reasoning")
+                if reasoning:
+                    ai_lines.append(f"    → {reasoning}")
+
+                validated_lines.append(f"  • {name} (ICD-10: {validated_code or 'Not found in database'})")
 
             if has_ai_codes:
-                parts.append("Diagnoses (AI-Inferred Codes):")
-                for diag in conditions:
-                    ai_code = diag.get("ai_icd10_code", "Not assigned")
-                    name = diag.get("name", "Unknown")
-                    confidence = diag.get("confidence", "").upper()
-                    reasoning = diag.get("code_reasoning", "")
-
-                    # Format confidence
-                    line = f"  - {name} (ICD-10: {ai_code})"
-                    if confidence:
-                        line += f" [{confidence}]"
-                    parts.append(line)
-
-                    if reasoning:
-                        parts.append(f"    → {reasoning}")
-
+                parts.extend(ai_lines)
             if has_validated_codes:
-                parts.append("\nDiagnoses (API-Validated Codes):")
-                for diag in conditions:
-                    validated_code = diag.get("validated_icd10_code", "Not found in database")
-                    name = diag.get("name", "Unknown")
-                    parts.append(f"  • {name} (ICD-10: {validated_code})")
+                parts.extend(validated_lines)
 
             # Fallback to old format if neither new field exists
             if not has_ai_codes and not has_validated_codes:
                 parts.append("Diagnoses:")
                 for diag in conditions:
-                    code = diag.get("icd10_code", "N/A")
-                    name = diag.get("name", "Unknown")
-                    parts.append(f"  • {name} (ICD-10: {code})")
+                    parts.append(f"  • {diag.get('name') or 'Unknown'} (ICD-10: {diag.get('icd10_code') or 'N/A'})")
 
         if structured.get("medications"):
             parts.append("\nMedications:")
             for med in structured["medications"]:
-                code = med.get("rxnorm_code", "N/A")
-                name = med.get("name", "Unknown")
-                parts.append(f"  • {name} (RxNorm: {code})")
+                parts.append(f"  • {med.get('name') or 'Unknown'} (RxNorm: {med.get('rxnorm_code') or 'N/A'})")
 
         if structured.get("procedures"):
             parts.append("\nProcedures:")
@@ -661,22 +705,19 @@ class MedicalChatbot:
 
     def _format_fhir(self, fhir_bundle: dict) -> str:
         """Format FHIR bundle as readable JSON."""
-        import json
-        return json.dumps(fhir_bundle, indent=2)
+        return orjson.dumps(fhir_bundle, option=orjson.OPT_INDENT_2).decode()
 
 
-# Global singleton
-chatbot_service = None
+# Global singleton instance; construction only sets up bookkeeping (services are
+# shared module singletons), so it is built at import instead of lazily
+chatbot_service = MedicalChatbot()
 
 
 def get_chatbot_service() -> MedicalChatbot:
     """
-    Get or create global chatbot instance.
+    Get the global chatbot instance.
 
     Returns:
         MedicalChatbot: Singleton chatbot instance
     """
-    global chatbot_service
-    if chatbot_service is None:
-        chatbot_service = MedicalChatbot()
     return chatbot_service
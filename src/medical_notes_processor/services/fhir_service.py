@@ -13,7 +13,7 @@ Converts to simplified FHIR R4 resources including:
 - CarePlan for treatment plans
 """
 
-from typing import Dict, Any, List
+from typing import List
 import logging
 
 from ..models.schemas import (
@@ -28,6 +28,15 @@ from ..models.schemas import (
 
 logger = logging.getLogger(__name__)
 
+# (VitalSigns field, display name, LOINC code) for each vital sign observation
+_VITAL_MAPPINGS = (
+    ("blood_pressure", "Blood Pressure", "85354-9"),
+    ("heart_rate", "Heart Rate", "8867-4"),
+    ("temperature", "Body Temperature", "8310-5"),
+    ("respiratory_rate", "Respiratory Rate", "9279-1"),
+    ("oxygen_saturation", "Oxygen Saturation", "2708-6"),
+)
+
 
 class FHIRService:
     """
@@ -40,6 +49,10 @@ class FHIRService:
     FHIR (Fast Healthcare Interoperability Resources) is the HL7 standard
     for healthcare data exchange. This implementation uses a simplified
     FHIR R4 format suitable for basic interoperability needs.
+
+    Resources are assembled with `model_construct` because every field is
+    derived from an already-validated StructuredMedicalData; validating the
+    nested output models again would only repeat that work.
     """
 
     def convert_to_fhir(self, structured_data: StructuredMedicalData) -> FHIRBundle:
@@ -69,7 +82,12 @@ class FHIRService:
             >>> print(fhir_bundle.patient.resourceType)
             "Patient"
         """
-        fhir_bundle = FHIRBundle()
+        fhir_bundle = FHIRBundle.model_construct()
+
+        # Every resource references the same patient, so build the reference once
+        patient_ref = None
+        if structured_data.patient and structured_data.patient.patient_id:
+            patient_ref = {"reference": f"Patient/{structured_data.patient.patient_id}"}
 
         # Convert Patient
         if structured_data.patient:
@@ -78,14 +96,14 @@ class FHIRService:
         # Convert Conditions
         if structured_data.conditions:
             fhir_bundle.conditions = [
-                self._convert_condition(cond, structured_data.patient)
+                self._convert_condition(cond, patient_ref)
                 for cond in structured_data.conditions
             ]
 
         # Convert Medications
         if structured_data.medications:
             fhir_bundle.medications = [
-                self._convert_medication(med, structured_data.patient)
+                self._convert_medication(med, patient_ref)
                 for med in structured_data.medications
             ]
 
@@ -93,39 +111,29 @@ class FHIRService:
         observations = []
         if structured_data.vital_signs:
             observations.extend(
-                self._convert_vital_signs(
-                    structured_data.vital_signs, structured_data.patient
-                )
+                self._convert_vital_signs(structured_data.vital_signs, patient_ref)
             )
         if structured_data.lab_results:
             observations.extend(
-                self._convert_lab_results(
-                    structured_data.lab_results, structured_data.patient
-                )
+                self._convert_lab_results(structured_data.lab_results, patient_ref)
             )
         fhir_bundle.observations = observations
 
         # Convert Plan to CarePlan
         if structured_data.plan_actions:
-            fhir_bundle.care_plan = self._convert_care_plan(
-                structured_data.plan_actions, structured_data.patient
-            )
+            fhir_bundle.care_plan = self._convert_care_plan(structured_data.plan_actions, patient_ref)
 
         return fhir_bundle
 
     def _convert_patient(self, patient_data) -> FHIRPatient:
-        return FHIRPatient(
+        return FHIRPatient.model_construct(
             id=patient_data.patient_id,
             name=patient_data.name,
             gender=patient_data.gender.lower() if patient_data.gender else None,
             birthDate=patient_data.date_of_birth,
         )
 
-    def _convert_condition(self, condition_data, patient_data) -> FHIRCondition:
-        patient_ref = None
-        if patient_data and patient_data.patient_id:
-            patient_ref = {"reference": f"Patient/{patient_data.patient_id}"}
-
+    def _convert_condition(self, condition_data, patient_ref) -> FHIRCondition:
         # Determine clinical status
         clinical_status = "active"
         if condition_data.status:
@@ -133,18 +141,14 @@ class FHIRService:
             if "resolved" in status_lower or "inactive" in status_lower:
                 clinical_status = "resolved"
 
-        return FHIRCondition(
+        return FHIRCondition.model_construct(
             code=condition_data.name,
             clinicalStatus=clinical_status,
             verificationStatus="confirmed",
             subject=patient_ref,
         )
 
-    def _convert_medication(self, medication_data, patient_data) -> FHIRMedication:
-        patient_ref = None
-        if patient_data and patient_data.patient_id:
-            patient_ref = {"reference": f"Patient/{patient_data.patient_id}"}
-
+    def _convert_medication(self, medication_data, patient_ref) -> FHIRMedication:
         med_codeable = {"text": medication_data.name}
         if medication_data.rxnorm_code:
             med_codeable["coding"] = [
@@ -164,31 +168,19 @@ class FHIRService:
                 }
             ]
 
-        return FHIRMedication(
+        return FHIRMedication.model_construct(
             medicationCodeableConcept=med_codeable,
             subject=patient_ref,
             dosageInstruction=dosage_instruction,
         )
 
-    def _convert_vital_signs(self, vital_signs_data, patient_data) -> List[FHIRObservation]:
+    def _convert_vital_signs(self, vital_signs_data, patient_ref) -> List[FHIRObservation]:
         observations = []
-        patient_ref = None
-        if patient_data and patient_data.patient_id:
-            patient_ref = {"reference": f"Patient/{patient_data.patient_id}"}
-
-        vital_mappings = {
-            "blood_pressure": ("Blood Pressure", "85354-9"),
-            "heart_rate": ("Heart Rate", "8867-4"),
-            "temperature": ("Body Temperature", "8310-5"),
-            "respiratory_rate": ("Respiratory Rate", "9279-1"),
-            "oxygen_saturation": ("Oxygen Saturation", "2708-6"),
-        }
-
-        for field, (display, loinc_code) in vital_mappings.items():
+        for field, display, loinc_code in _VITAL_MAPPINGS:
             value = getattr(vital_signs_data, field, None)
             if value:
                 observations.append(
-                    FHIRObservation(
+                    FHIRObservation.model_construct(
                         code={
                             "coding": [
                                 {
@@ -207,14 +199,10 @@ class FHIRService:
 
         return observations
 
-    def _convert_lab_results(self, lab_results_data, patient_data) -> List[FHIRObservation]:
+    def _convert_lab_results(self, lab_results_data, patient_ref) -> List[FHIRObservation]:
         observations = []
-        patient_ref = None
-        if patient_data and patient_data.patient_id:
-            patient_ref = {"reference": f"Patient/{patient_data.patient_id}"}
-
         for lab in lab_results_data:
-            observation = FHIRObservation(
+            observation = FHIRObservation.model_construct(
                 code={"text": lab.test_name},
                 status="final",
                 subject=patient_ref,
@@ -232,11 +220,7 @@ class FHIRService:
 
         return observations
 
-    def _convert_care_plan(self, plan_actions_data, patient_data) -> FHIRCarePlan:
-        patient_ref = None
-        if patient_data and patient_data.patient_id:
-            patient_ref = {"reference": f"Patient/{patient_data.patient_id}"}
-
+    def _convert_care_plan(self, plan_actions_data, patient_ref) -> FHIRCarePlan:
         activities = []
         for action in plan_actions_data:
             activity = {
@@ -250,7 +234,7 @@ class FHIRService:
                 activity["detail"]["scheduledString"] = action.timing
             activities.append(activity)
 
-        return FHIRCarePlan(
+        return FHIRCarePlan.model_construct(
             status="active",
             intent="plan",
             subject=patient_ref,
@@ -7,13 +7,24 @@ to perform medical note summarization tasks. Uses LangChain for LLM orchestratio
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import hashlib
 import logging
 
+from ..core.cache import get_cache
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_SYSTEM_PROMPT = """You are a medical documentation expert.
+Summarize the following medical note concisely, highlighting:
+- Patient's main complaint
+- Key findings
+- Diagnosis/Assessment
+- Treatment plan
+
+Keep the summary clear and professional."""
+
 
 class LLMService:
     """
@@ -47,7 +58,9 @@ class LLMService:
         - Diagnosis or assessment
         - Treatment plan and follow-up
 
-        Uses a temperature of 0.0 for consistent, deterministic summaries.
+        Uses a temperature of 0.0 for consistent, deterministic summaries, so
+        summaries are cached by a hash of the note (and model and prompt) for
+        settings.summary_cache_ttl seconds; identical notes skip the LLM call.
 
         Args:
             text (str): Raw medical note text (typically in SOAP format)
@@ -66,30 +79,48 @@ class LLMService:
             >>> print(result["summary"])
             "Patient presented with acute chest pain..."
         """
-        system_prompt = """You are a medical documentation expert.
-Summarize the following medical note concisely, highlighting:
-- Patient's main complaint
-- Key findings
-- Diagnosis/Assessment
-- Treatment plan
-
-Keep the summary clear and professional."""
+        cache_key = self._cache_key(text)
+        cached = await self._get_cached(cache_key)
+        if cached is not None:
+            return {"summary": cached, "model_used": settings.openai_model}
 
         messages = [
-            SystemMessage(content=system_prompt),
+            SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
             HumanMessage(content=text)
         ]
 
         try:
             response = await self.llm.ainvoke(messages)
-            return {
-                "summary": response.content,
-                "model_used": settings.openai_model
-            }
         except Exception as e:
             logger.error(f"Error calling LLM API: {str(e)}")
             raise
 
+        await self._set_cached(cache_key, response.content)
+        return {
+            "summary": response.content,
+            "model_used": settings.openai_model
+        }
+
+    def _cache_key(self, text: str) -> str:
+        digest = hashlib.sha256(
+            f"{settings.openai_model}\n{SUMMARY_SYSTEM_PROMPT}\n{text}".encode("utf-8")
+        ).hexdigest()
+        return f"summary:{digest}"
+
+    async def _get_cached(self, cache_key: str) -> Optional[str]:
+        # Cache failures (e.g. Redis down) must never fail a summary
+        try:
+            return await get_cache().get(cache_key)
+        except Exception as e:
+            logger.warning(f"Summary cache read failed: {str(e)}")
+        return None
+
+    async def _set_cached(self, cache_key: str, summary: str) -> None:
+        try:
+            await get_cache().set(cache_key, summary, ttl=settings.summary_cache_ttl)
+        except Exception as e:
+            logger.warning(f"Summary cache write failed: {str(e)}")
+
 
 # Global singleton instance for use throughout the application
 llm_service = LLMService()
@@ -3,14 +3,32 @@ from langchain_community.vectorstores import Qdrant
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.messages import HumanMessage, SystemMessage
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
-from typing import List, Dict, Any
+from qdrant_client.models import Distance, OptimizersConfigDiff, VectorParams
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Mapping, Optional, Sequence
+import asyncio
+import hashlib
 import logging
+import time
 
+import orjson
+
+from ..core.cache import get_cache
 from ..core.config import settings
+from ..models.schemas import SourceRef
 
 logger = logging.getLogger(__name__)
 
+# Documents per indexing batch, and batches kept in flight at once
+INDEX_BATCH_SIZE = 32
+INDEX_CONCURRENCY = 4
+# Chunks sent per embedding request and Qdrant upsert within a batch
+INDEX_CHUNK_BATCH_SIZE = 256
+
+# Cache entry whose value changes whenever documents are (re)indexed; it is part of
+# every answer cache key, so indexing implicitly invalidates all cached answers
+INDEX_GENERATION_KEY = "rag:index_generation"
+
 
 class RAGService:
     def __init__(self):
@@ -31,6 +49,11 @@ class RAGService:
         )
         self.collection_name = settings.qdrant_collection_name
         self._ensure_collection()
+        self.vectorstore = Qdrant(
+            client=self.qdrant_client,
+            collection_name=self.collection_name,
+            embeddings=self.embeddings,
+        )
 
     def _ensure_collection(self):
         try:
@@ -45,7 +68,67 @@ class RAGService:
             logger.error(f"Error ensuring collection: {str(e)}")
             raise
 
-    async def index_documents(self, documents: List[Dict[str, Any]]) -> None:
+    @asynccontextmanager
+    async def bulk_load(self) -> AsyncIterator[None]:
+        """
+        Pause HNSW index building while many documents are uploaded.
+
+        Sets the collection's indexing_threshold to 0 for the duration of the block
+        and restores it afterwards, so Qdrant builds the index once instead of
+        continuously during the upload. A collection using the server default
+        (threshold unset) is restored to settings.qdrant_indexing_threshold. The
+        Qdrant client is synchronous, so its calls run in a worker thread.
+        """
+        paused = False
+        previous = None
+        try:
+            info = await asyncio.to_thread(self.qdrant_client.get_collection, self.collection_name)
+            previous = info.config.optimizer_config.indexing_threshold
+            await asyncio.to_thread(
+                self.qdrant_client.update_collection,
+                collection_name=self.collection_name,
+                optimizer_config=OptimizersConfigDiff(indexing_threshold=0),
+            )
+            paused = True
+        except Exception as e:
+            logger.warning(f"Could not pause indexing for bulk load: {str(e)}")
+        try:
+            yield
+        finally:
+            if paused:
+                threshold = previous if previous is not None else settings.qdrant_indexing_threshold
+                try:
+                    await asyncio.to_thread(
+                        self.qdrant_client.update_collection,
+                        collection_name=self.collection_name,
+                        optimizer_config=OptimizersConfigDiff(indexing_threshold=threshold),
+                    )
+                except Exception as e:
+                    logger.error(f"Could not restore indexing threshold: {str(e)}")
+
+    async def index_documents(self, documents: Sequence[Mapping[str, Any]]) -> None:
+        """
+        Index documents in batches of INDEX_BATCH_SIZE, uploading up to
+        INDEX_CONCURRENCY batches concurrently.
+        """
+        semaphore = asyncio.Semaphore(INDEX_CONCURRENCY)
+
+        async def upload(batch: Sequence[Mapping[str, Any]]) -> None:
+            async with semaphore:
+                await self._index_batch(batch)
+
+        await asyncio.gather(*[
+            upload(documents[i:i + INDEX_BATCH_SIZE])
+            for i in range(0, len(documents), INDEX_BATCH_SIZE)
+        ])
+        logger.info(f"Indexed {len(documents)} documents")
+
+        try:
+            await get_cache().set(INDEX_GENERATION_KEY, str(time.time_ns()))
+        except Exception as e:
+            logger.warning(f"Could not invalidate cached answers: {str(e)}")
+
+    async def _index_batch(self, documents: Sequence[Mapping[str, Any]]) -> None:
         try:
             all_chunks = []
             metadatas = []
@@ -61,27 +144,77 @@ class RAGService:
                     })
 
             if all_chunks:
-                vectorstore = Qdrant(
-                    client=self.qdrant_client,
-                    collection_name=self.collection_name,
-                    embeddings=self.embeddings,
+                await self.vectorstore.aadd_texts(
+                    texts=all_chunks,
+                    metadatas=metadatas,
+                    batch_size=INDEX_CHUNK_BATCH_SIZE,
                 )
-                await vectorstore.aadd_texts(texts=all_chunks, metadatas=metadatas)
                 logger.info(f"Indexed {len(all_chunks)} chunks from {len(documents)} documents")
         except Exception as e:
             logger.error(f"Error indexing documents: {str(e)}")
             raise
 
     async def answer_question(self, question: str, top_k: int = 3) -> Dict[str, Any]:
+        """
+        Answer a question from the indexed documents.
+
+        Answers are cached for settings.rag_answer_cache_ttl seconds, keyed by the
+        question with case and whitespace normalized, so repeated questions skip
+        the embedding, vector search and LLM calls. Reindexing invalidates them.
+        """
+        cache_key = await self._answer_cache_key(question, top_k)
+        if cache_key is not None:
+            try:
+                cached = await get_cache().get(cache_key)
+                if cached is not None:
+                    result = orjson.loads(cached)
+                    result["sources"] = [SourceRef.model_validate(src) for src in result["sources"]]
+                    return result
+            except Exception as e:
+                logger.warning(f"Answer cache read failed: {str(e)}")
+
+        result = await self._generate_answer(question, top_k)
+
+        if cache_key is not None:
+            try:
+                await get_cache().set(
+                    cache_key,
+                    orjson.dumps({
+                        "answer": result["answer"],
+                        "sources": [src.model_dump() for src in result["sources"]],
+                    }).decode(),
+                    ttl=settings.rag_answer_cache_ttl,
+                )
+            except Exception as e:
+                logger.warning(f"Answer cache write failed: {str(e)}")
+        return result
+
+    async def _answer_cache_key(self, question: str, top_k: int) -> Optional[str]:
+        # Cache failures (e.g. Redis down) only disable caching for this question
         try:
-            vectorstore = Qdrant(
-                client=self.qdrant_client,
-                collection_name=self.collection_name,
-                embeddings=self.embeddings,
-            )
+            generation = await get_cache().get(INDEX_GENERATION_KEY)
+            if generation is None:
+                # Never indexed in this cache (or evicted): start a fresh generation so
+                # answers cached under an earlier one cannot be served
+                generation = str(time.time_ns())
+                await get_cache().set(INDEX_GENERATION_KEY, generation)
+        except Exception as e:
+            logger.warning(f"Answer cache read failed: {str(e)}")
+            return None
+        normalized = " ".join(question.lower().split())
+        digest = hashlib.sha256(
+            f"{settings.openai_model}\n{top_k}\n{normalized}".encode("utf-8")
+        ).hexdigest()
+        return f"rag:answer:{generation}:{digest}"
 
-            # Retrieve relevant documents
-            docs = await vectorstore.asimilarity_search_with_score(question, k=top_k)
+    async def _generate_answer(self, question: str, top_k: int) -> Dict[str, Any]:
+        try:
+            # Embed the question once and search by vector, so any further retrieval
+            # step can reuse the embedding instead of paying for another API call
+            question_vector = await self.embeddings.aembed_query(question)
+            docs = await self.vectorstore.asimilarity_search_with_score_by_vector(
+                question_vector, k=top_k
+            )
 
             if not docs:
                 return {
@@ -114,13 +247,13 @@ Answer:"""
 
             # Prepare sources
             sources = [
-                {
-                    "document_id": doc.metadata.get("document_id"),
-                    "title": doc.metadata.get("title"),
-                    "chunk_index": doc.metadata.get("chunk_index"),
-                    "content_preview": doc.page_content[:200] + "...",
-                    "relevance_score": float(score),
-                }
+                SourceRef(
+                    document_id=doc.metadata.get("document_id"),
+                    title=doc.metadata.get("title"),
+                    chunk_index=doc.metadata.get("chunk_index"),
+                    content_preview=doc.page_content[:200] + "...",
+                    relevance_score=float(score),
+                )
                 for doc, score in docs
             ]
 
@@ -7,18 +7,28 @@ to enrich medical data with standardized codes:
 - NLM Clinical Tables API for ICD-10 diagnosis codes
 
 The client includes automatic retry logic with exponential backoff for resilience.
+Successful lookups are cached by normalized name, so repeated medications or
+conditions (within a note or across notes) only hit the external APIs once.
 """
 
+import asyncio
 import httpx
-from typing import Optional, Dict, Any, List
+import orjson
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from ..core.cache import get_cache
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _normalize_name(name: str) -> str:
+    """Normalize a medication/condition name for deduplication and cache keys."""
+    return " ".join(name.lower().split())
+
+
 class ExternalAPIClient:
     """
     Client for external medical terminology APIs.
@@ -35,6 +45,7 @@ class ExternalAPIClient:
         nlm_base_url (str): Base URL for NLM RxNorm API
         clinicaltables_base_url (str): Base URL for Clinical Tables API
         timeout (float): Request timeout in seconds
+        client (httpx.AsyncClient): Pooled HTTP client shared by all lookups
     """
 
     def __init__(self):
@@ -42,6 +53,19 @@ class ExternalAPIClient:
         self.nlm_base_url = settings.nlm_api_base_url
         self.clinicaltables_base_url = settings.clinicaltables_api_base_url
         self.timeout = 300.0
+        # One pooled client for every lookup so keep-alive connections are reused
+        # instead of paying a TCP/TLS handshake per code
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        # Lookups run concurrently, but only this many API calls are in flight at once
+        self._lookup_slots = asyncio.Semaphore(settings.nlm_max_concurrent_lookups)
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self.client.aclose()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
     async def get_rxnorm_code(self, medication_name: str) -> Optional[str]:
@@ -70,20 +94,19 @@ class ExternalAPIClient:
             Returns the first RxCUI if multiple matches are found.
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                url = f"{self.nlm_base_url}/rxcui.json"
-                params = {"name": medication_name}
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-                if "idGroup" in data and "rxnormId" in data["idGroup"]:
-                    rxnorm_ids = data["idGroup"]["rxnormId"]
-                    if rxnorm_ids and len(rxnorm_ids) > 0:
-                        return rxnorm_ids[0]
-
-                logger.warning(f"No RxNorm code found for medication: {medication_name}")
-                return None
+            url = f"{self.nlm_base_url}/rxcui.json"
+            params = {"name": medication_name}
+            response = await self.client.get(url, params=params)
+            response.raise_for_status()
+
+            data = orjson.loads(response.content)
+            if "idGroup" in data and "rxnormId" in data["idGroup"]:
+                rxnorm_ids = data["idGroup"]["rxnormId"]
+                if rxnorm_ids and len(rxnorm_ids) > 0:
+                    return rxnorm_ids[0]
+
+            logger.warning(f"No RxNorm code found for medication: {medication_name}")
+            return None
         except Exception as e:
             logger.error(f"Error fetching RxNorm code for {medication_name}: {str(e)}")
             return None
@@ -114,27 +137,73 @@ class ExternalAPIClient:
             Returns the first (most relevant) ICD-10 code from search results.
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                url = f"{self.clinicaltables_base_url}/icd10cm/v3/search"
-                params = {
-                    "sf": "code,name",
-                    "terms": condition_name,
-                    "maxList": 1,
-                }
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-                if data and len(data) >= 4 and data[3] and len(data[3]) > 0:
-                    # data[3] contains the results, each result is [code, name]
-                    return data[3][0][0]
-
-                logger.warning(f"No ICD-10 code found for condition: {condition_name}")
-                return None
+            url = f"{self.clinicaltables_base_url}/icd10cm/v3/search"
+            params = {
+                "sf": "code,name",
+                "terms": condition_name,
+                "maxList": 1,
+            }
+            response = await self.client.get(url, params=params)
+            response.raise_for_status()
+
+            data = orjson.loads(response.content)
+            if data and len(data) >= 4 and data[3] and len(data[3]) > 0:
+                # data[3] contains the results, each result is [code, name]
+                return data[3][0][0]
+
+            logger.warning(f"No ICD-10 code found for condition: {condition_name}")
+            return None
         except Exception as e:
             logger.error(f"Error fetching ICD-10 code for {condition_name}: {str(e)}")
             return None
 
+    async def _cached_lookup(
+        self, kind: str, name: str, lookup: Callable[[str], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Look up a code through the shared cache, keyed by normalized name.
+
+        Only codes that were found are cached; a miss may be a transient API
+        error, so it is retried on the next request.
+
+        Args:
+            kind (str): Cache namespace, e.g. "rxnorm" or "icd10"
+            name (str): Medication or condition name as extracted
+            lookup (Callable): Coroutine function performing the API lookup
+
+        Returns:
+            Optional[str]: The code if found, None otherwise
+        """
+        key = f"{kind}:{_normalize_name(name)}"
+        try:
+            cached = await get_cache().get(key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning(f"Code lookup cache read failed: {str(e)}")
+
+        async with self._lookup_slots:
+            code = await lookup(name)
+        if code:
+            try:
+                await get_cache().set(key, code, ttl=settings.code_lookup_cache_ttl)
+            except Exception as e:
+                logger.warning(f"Code lookup cache write failed: {str(e)}")
+        return code
+
+    async def _lookup_unique(
+        self, kind: str, items: List[Dict[str, Any]], lookup: Callable[[str], Awaitable[Optional[str]]]
+    ) -> Dict[str, Optional[str]]:
+        """Look up each distinct normalized name once, concurrently; returns {normalized_name: code}."""
+        names: Dict[str, str] = {}
+        for item in items:
+            if "name" in item:
+                names.setdefault(_normalize_name(item["name"]), item["name"])
+        codes = await asyncio.gather(
+            *(self._cached_lookup(kind, name, lookup) for name in names.values())
+        )
+        return dict(zip(names, codes))
+
     async def enrich_medications(
         self, medications: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -160,15 +229,15 @@ class ExternalAPIClient:
         Note:
             Medications without a "name" field are skipped.
             If a code cannot be found, the medication is still included without the code.
+            Duplicate names (case-insensitive) are looked up only once.
         """
+        codes = await self._lookup_unique("rxnorm", medications, self.get_rxnorm_code)
         enriched = []
         for med in medications:
             if "name" in med:
-                rxnorm_code = await self.get_rxnorm_code(med["name"])
-                med_copy = med.copy()
-                if rxnorm_code:
-                    med_copy["rxnorm_code"] = rxnorm_code
-                enriched.append(med_copy)
+                rxnorm_code = codes[_normalize_name(med["name"])]
+                # Build each enriched copy in one allocation; the input dicts are not modified
+                enriched.append({**med, "rxnorm_code": rxnorm_code} if rxnorm_code else med.copy())
         return enriched
 
     async def enrich_conditions(
@@ -199,21 +268,20 @@ class ExternalAPIClient:
         Note:
             Conditions without a "name" field are skipped.
             If API validation fails, only AI code is present.
+            Duplicate names (case-insensitive) are looked up only once.
         """
+        codes = await self._lookup_unique("icd10", conditions, self.get_icd10_code)
         enriched = []
         for cond in conditions:
             if "name" in cond:
-                cond_copy = cond.copy()
+                # Get API-validated code
+                validated_code = codes[_normalize_name(cond["name"])]
+                cond_copy = {**cond, "validated_icd10_code": validated_code} if validated_code else cond.copy()
 
                 # Preserve AI-suggested code
                 if "suggested_icd10_code" in cond_copy:
                     cond_copy["ai_icd10_code"] = cond_copy.pop("suggested_icd10_code")
 
-                # Get API-validated code
-                validated_code = await self.get_icd10_code(cond["name"])
-                if validated_code:
-                    cond_copy["validated_icd10_code"] = validated_code
-
                 enriched.append(cond_copy)
         return enriched
 
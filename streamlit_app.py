@@ -8,6 +8,7 @@ processing system using the chatbot API.
 import streamlit as st
 import requests
 import os
+import uuid
 from typing import Dict, Any
 
 # API Configuration - read from environment or use default
@@ -47,7 +48,6 @@ if "conversation_count" not in st.session_state:
 
 # Generate a unique session ID for this Streamlit session
 if "session_id" not in st.session_state:
-    import uuid
     st.session_state.session_id = str(uuid.uuid4())
 
 
@@ -6,7 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.pool import StaticPool
 
 from medical_notes_processor.main import app
-from medical_notes_processor.db.base import Base, get_db
+from medical_notes_processor.core import cache as cache_module
+from medical_notes_processor.db.base import Base, engine, get_db
 
 
 # Test database URL
@@ -21,6 +22,13 @@ def event_loop() -> Generator:
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    """Give every test empty in-process caches so cached results don't leak between tests."""
+    monkeypatch.setattr(cache_module, "cache", cache_module.InMemoryCache())
+    monkeypatch.setattr(cache_module, "history_cache", cache_module.InMemoryCache(maxsize=None))
+
+
 @pytest.fixture(scope="function")
 async def test_db() -> AsyncGenerator[AsyncSession, None]:
     """Create test database session."""
@@ -61,3 +69,6 @@ async def client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
     app.dependency_overrides.clear()
+    # The chatbot opens its own sessions on the app engine; close them on this
+    # test's event loop so no pooled connection outlives it
+    await engine.dispose()
@@ -0,0 +1,98 @@
+import pytest
+
+from medical_notes_processor.core.cache import InMemoryCache
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_set_and_get():
+    """Test storing and reading back a value."""
+    cache = InMemoryCache()
+
+    await cache.set("key", "value")
+
+    assert await cache.get("key") == "value"
+    assert await cache.get("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_expires_entries(monkeypatch):
+    """Test that entries past their TTL are dropped."""
+    import medical_notes_processor.core.cache as cache_module
+
+    now = 1000.0
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    cache = InMemoryCache()
+    await cache.set("key", "value", ttl=10)
+
+    now = 1011.0
+    assert await cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_evicts_least_recently_used():
+    """Test LRU eviction once maxsize is exceeded."""
+    cache = InMemoryCache(maxsize=2)
+
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    await cache.get("a")  # "b" is now least recently used
+    await cache.set("c", "3")
+
+    assert await cache.get("a") == "1"
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "3"
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_delete():
+    """Test deleting a key."""
+    cache = InMemoryCache()
+    await cache.set("key", "value")
+
+    await cache.delete("key")
+
+    assert await cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_append_list_keeps_last_entries():
+    """Test that appended lists are capped to the most recent entries."""
+    cache = InMemoryCache()
+
+    await cache.append_list("chat:s1", ["a", "b"], maxlen=3)
+    await cache.append_list("chat:s1", ["c", "d"], maxlen=3)
+
+    assert await cache.get_list("chat:s1") == ["b", "c", "d"]
+    assert await cache.get_list("chat:missing") == []
+
+
+@pytest.mark.asyncio
+async def test_chat_history_survives_general_cache_eviction():
+    """Test that filling the general cache never evicts a chat history."""
+    from medical_notes_processor.api.chat import append_history, load_history
+    from medical_notes_processor.core.cache import get_cache
+
+    await append_history("session", [{"role": "user", "content": "hello"}])
+
+    general = get_cache()
+    for i in range(general.maxsize * 2):
+        await general.set(f"document:{i}", "{}")
+
+    assert await load_history("session") == [{"role": "user", "content": "hello"}]
+
+
+@pytest.mark.asyncio
+async def test_unbounded_cache_drops_expired_entries(monkeypatch):
+    """Test that a cache without maxsize still drops entries once their TTL passes."""
+    import medical_notes_processor.core.cache as cache_module
+
+    now = 1000.0
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    cache = InMemoryCache(maxsize=None)
+    await cache.append_list("old", ["a"], maxlen=20, ttl=10)
+
+    now = 1011.0
+    await cache.append_list("new", ["b"], maxlen=20, ttl=10)
+
+    assert "old" not in cache._data
+    assert await cache.get_list("new") == ["b"]
@@ -2,9 +2,11 @@
 Tests for chatbot features: multi-document queries, conversation memory, and context detection.
 """
 
+import asyncio
 import pytest
 from httpx import AsyncClient
 from unittest.mock import patch, AsyncMock
+from medical_notes_processor.models.schemas import StructuredMedicalData
 from medical_notes_processor.services.chatbot_service import MedicalChatbot
 
 
@@ -110,6 +112,10 @@ class TestMultiDocumentQueries:
                 assert "Summary B" in result
                 assert "Summary C" in result
 
+                # Summaries are separated from each other, not preceded by a separator
+                assert result.startswith("**Patient A**")
+                assert result.count("=" * 50) == 2
+
     @pytest.mark.asyncio
     async def test_multi_document_code_extraction(self):
         """Test extracting codes from multiple documents."""
@@ -138,6 +144,31 @@ class TestMultiDocumentQueries:
                 assert "Patient A" in result
                 assert "Patient B" in result
 
+    @pytest.mark.asyncio
+    async def test_concurrent_extraction_is_shared(self):
+        """Test that overlapping extractions of the same note run the agent once."""
+        chatbot = MedicalChatbot()
+
+        async def slow_extract(text):
+            await asyncio.sleep(0.01)
+            return StructuredMedicalData(conditions=[{"name": "Diabetes"}])
+
+        with patch(
+            'medical_notes_processor.services.chatbot_service.extraction_agent.extract_structured_data',
+            side_effect=slow_extract,
+        ) as mock_agent:
+            first, second = await asyncio.gather(
+                chatbot._extract_codes("Diabetes"), chatbot._extract_codes("Diabetes")
+            )
+
+            assert mock_agent.call_count == 1
+            assert first == second
+            assert first["conditions"][0]["name"] == "Diabetes"
+
+            # Once finished, a later request runs a fresh extraction
+            await chatbot._extract_codes("Diabetes")
+            assert mock_agent.call_count == 2
+
 
 class TestConversationMemory:
     """Tests for conversation memory and context detection."""
@@ -307,6 +338,9 @@ class TestKeywordDetection:
         assert not chatbot._needs_code_extraction("summarize the document")
         assert not chatbot._needs_code_extraction("what medications were prescribed")
         assert not chatbot._needs_code_extraction("show me the patient info")
+        # Keywords only match whole words
+        assert not chatbot._needs_code_extraction("is she taking metformin tablets?")
+        assert not chatbot._needs_code_extraction("any specialist referrals?")
 
     def test_needs_summarization_detection(self):
         """Test detection of summarization requests."""
@@ -323,6 +357,34 @@ class TestKeywordDetection:
         assert not chatbot._needs_summarization("what are the medications")
         assert not chatbot._needs_summarization("show me patient data")
 
+    def test_needs_rag_detection(self):
+        """Test that small talk and document inventory questions skip RAG."""
+        chatbot = MedicalChatbot()
+
+        # Should search
+        assert chatbot._needs_rag("what medications is the patient on?")
+        assert chatbot._needs_rag("hi, does anyone have a penicillin allergy?")
+        assert chatbot._needs_rag("helpful info on diabetes")
+
+        # Should not search
+        assert not chatbot._needs_rag("hello!")
+        assert not chatbot._needs_rag("thanks")
+        assert not chatbot._needs_rag("what documents do you have?")
+
+    @pytest.mark.asyncio
+    async def test_small_talk_skips_rag(self):
+        """Test that greetings are answered with the document list, not RAG."""
+        chatbot = MedicalChatbot()
+
+        with patch.object(chatbot, '_rag_search') as mock_rag:
+            with patch.object(chatbot, '_get_documents_list') as mock_list:
+                mock_list.return_value = "Available medical documents: ..."
+
+                result = await chatbot.chat("hi")
+
+                assert not mock_rag.called
+                assert result == "Available medical documents: ..."
+
 
 @pytest.mark.asyncio
 async def test_chat_api_conversation_memory(client: AsyncClient):
@@ -1,5 +1,6 @@
 import pytest
 from httpx import AsyncClient
+from unittest.mock import AsyncMock, patch
 
 
 @pytest.mark.asyncio
@@ -41,7 +42,7 @@ async def test_get_all_document_ids(client: AsyncClient):
 
 @pytest.mark.asyncio
 async def test_get_all_documents(client: AsyncClient):
-    """Test getting all documents with full details."""
+    """Test listing all documents without their content."""
     # Create a document first
     document_data = {
         "title": "Test Note",
@@ -57,6 +58,25 @@ async def test_get_all_documents(client: AsyncClient):
     assert isinstance(data, list)
     assert len(data) > 0
     assert "title" in data[0]
+    assert "patient_name" in data[0]
+    assert "content" not in data[0]
+
+
+@pytest.mark.asyncio
+async def test_get_all_documents_full(client: AsyncClient):
+    """Test getting all documents with full details."""
+    document_data = {
+        "title": "Test Note",
+        "content": "Test content"
+    }
+    await client.post("/documents", json=document_data)
+
+    response = await client.get("/documents/all/full")
+    assert response.status_code == 200
+
+    data = response.json()
+    assert len(data) > 0
+    assert "title" in data[0]
     assert "content" in data[0]
 
 
@@ -80,6 +100,24 @@ async def test_get_document_by_id(client: AsyncClient):
     assert data["title"] == document_data["title"]
 
 
+@pytest.mark.asyncio
+async def test_get_documents_batch(client: AsyncClient):
+    """Test fetching several documents in one request."""
+    ids = []
+    for title in ["Batch Note A", "Batch Note B"]:
+        create_response = await client.post("/documents", json={"title": title, "content": "Test content"})
+        ids.append(create_response.json()["id"])
+
+    # Request order is kept, duplicates are returned once and unknown IDs are skipped
+    response = await client.post("/documents/batch", json={"ids": [ids[1], 99999, ids[0], ids[1]]})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [doc["id"] for doc in data] == [ids[1], ids[0]]
+    assert data[0]["title"] == "Batch Note B"
+    assert data[0]["content"] == "Test content"
+
+
 @pytest.mark.asyncio
 async def test_get_nonexistent_document(client: AsyncClient):
     """Test getting a document that doesn't exist."""
@@ -107,6 +145,21 @@ async def test_delete_document(client: AsyncClient):
     assert get_response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_delete_document_when_cache_unavailable(client: AsyncClient):
+    """Test that a failing cache eviction does not fail or roll back the delete."""
+    create_response = await client.post("/documents", json={"title": "Test Note", "content": "Test content"})
+    doc_id = create_response.json()["id"]
+
+    with patch("medical_notes_processor.core.cache.InMemoryCache.delete", new_callable=AsyncMock) as mock_delete:
+        mock_delete.side_effect = ConnectionError("cache unavailable")
+        response = await client.delete(f"/documents/{doc_id}")
+        assert response.status_code == 204
+
+    get_response = await client.get(f"/documents/{doc_id}")
+    assert get_response.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_create_document_validation(client: AsyncClient):
     """Test document creation with invalid data."""
@@ -0,0 +1,65 @@
+"""
+Tests for MedicalExtractionAgent that mock the OpenAI client, so they run without an API key.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from medical_notes_processor.models.schemas import StructuredMedicalData
+
+
+@pytest.mark.asyncio
+async def test_extraction_request_kwargs():
+    """Test that structured-output calls, including the fallback pass, never send a Predicted Output."""
+    from medical_notes_processor.agents.extraction_agent import MedicalExtractionAgent
+    from medical_notes_processor.core.config import settings
+
+    low_confidence = StructuredMedicalData.model_validate(
+        {"conditions": [{"name": "Chest pain", "confidence": "low"}]}
+    )
+    completion = MagicMock()
+    completion.choices[0].message.parsed = low_confidence
+
+    agent = MedicalExtractionAgent()
+    agent.openai_client = MagicMock()
+    parse = agent.openai_client.beta.chat.completions.parse = AsyncMock(return_value=completion)
+
+    await agent._extract_raw_data("Patient reports intermittent chest pain.")
+
+    # Low confidence triggers the fallback model, so both passes are checked
+    assert [call.kwargs["model"] for call in parse.await_args_list] == [
+        settings.openai_extraction_model,
+        settings.openai_extraction_fallback_model,
+    ]
+    for call in parse.await_args_list:
+        assert call.kwargs["response_format"] is StructuredMedicalData
+        assert call.kwargs["temperature"] == 0.0
+        assert "prediction" not in call.kwargs
+
+
+@pytest.mark.asyncio
+async def test_cached_extraction_retries_code_lookup():
+    """Test that a cached extraction re-runs enrichment instead of reusing a failed lookup."""
+    from medical_notes_processor.agents.extraction_agent import extraction_agent
+
+    note = "Diagnosis: Steroid-induced diabetes mellitus"
+
+    with patch('medical_notes_processor.agents.extraction_agent.extraction_agent._extract_raw_data', new_callable=AsyncMock) as mock_extract:
+        mock_extract.return_value = StructuredMedicalData.model_validate_json("""
+        {
+            "conditions": [
+                {"name": "Steroid-induced diabetes mellitus", "status": "active", "suggested_icd10_code": "E09.9"}
+            ]
+        }
+        """)
+
+        with patch('medical_notes_processor.utils.external_apis.external_api_client.get_icd10_code') as mock_api:
+            mock_api.side_effect = [None, "E09.9"]
+
+            first = await extraction_agent.extract_structured_data(note)
+            second = await extraction_agent.extract_structured_data(note)
+
+            # The LLM ran once; the second call came from the cache but looked the code up again
+            assert mock_extract.await_count == 1
+            assert first.conditions[0].validated_icd10_code is None
+            assert second.conditions[0].validated_icd10_code == "E09.9"
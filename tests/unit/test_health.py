@@ -19,3 +19,13 @@ async def test_root_endpoint(client: AsyncClient):
     assert "message" in data
     assert "version" in data
     assert "docs" in data
+
+
+@pytest.mark.asyncio
+async def test_debug_pool_endpoint(client: AsyncClient):
+    """Test database pool status endpoint."""
+    response = await client.get("/debug/pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert "pool_class" in data
+    assert "checked_out" in data
@@ -0,0 +1,25 @@
+"""
+Tests for RAGService that mock the Qdrant client, so they run without an API key.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_restores_default_threshold():
+    """Test bulk_load restores the default threshold when the collection had none set."""
+    from medical_notes_processor.core.config import settings
+    from medical_notes_processor.services.rag_service import RAGService
+
+    service = RAGService.__new__(RAGService)
+    service.collection_name = "test_collection"
+    service.qdrant_client = MagicMock()
+    service.qdrant_client.get_collection.return_value.config.optimizer_config.indexing_threshold = None
+
+    async with service.bulk_load():
+        paused = service.qdrant_client.update_collection.call_args.kwargs["optimizer_config"]
+        assert paused.indexing_threshold == 0
+
+    restored = service.qdrant_client.update_collection.call_args.kwargs["optimizer_config"]
+    assert restored.indexing_threshold == settings.qdrant_indexing_threshold
@@ -3,6 +3,7 @@ Tests for table formatting feature in chatbot.
 """
 
 import pytest
+from unittest.mock import AsyncMock
 from medical_notes_processor.services.chatbot_service import MedicalChatbot
 
 
@@ -312,6 +313,21 @@ class TestTableFormatting:
         message2 = "give me the icd10 codes for doc 1 and 2"
         assert "table" not in message2.lower()
 
+    @pytest.mark.asyncio
+    async def test_table_keyword_matches_whole_word(self):
+        """Test that 'tablets' does not trigger table formatting but 'table' does."""
+        chatbot = MedicalChatbot()
+        doc = {"id": 1, "title": "Medical Note - Case 01", "content": "..."}
+        structured = {"medications": [{"name": "Metformin", "dosage": "500mg tablets", "rxnorm_code": "6809"}]}
+        chatbot._get_document_with_codes = AsyncMock(return_value=(doc, structured))
+
+        # Single document defaults to the list format
+        response = await chatbot.chat("codes for document 1, she takes tablets", extraction_cache={})
+        assert "| Case | Document Title |" not in response
+
+        response = await chatbot.chat("codes for document 1 in a table", extraction_cache={})
+        assert "| Case | Document Title |" in response
+
     def test_format_as_table_handles_diagnoses_key(self):
         """Test that table formatting works with 'diagnoses' key (alternative to 'conditions')."""
         chatbot = MedicalChatbot()
@@ -421,3 +437,56 @@ class TestTableFormattingEdgeCases:
             if line.strip():  # Skip empty lines
                 assert line.startswith("|")
                 assert line.endswith("|")
+
+    def test_formats_handle_null_fields(self):
+        """Test fields present as None (as dumped from the models) get placeholders."""
+        chatbot = MedicalChatbot()
+
+        condition = {
+            "name": "Diabetes", "ai_icd10_code": "E11.9", "validated_icd10_code": None,
+            "confidence": None, "code_reasoning": None,
+        }
+        medication = {"name": "Metformin", "rxnorm_code": None}
+        table_data = [
+            {
+                "doc_id": 1,
+                "title": "Test",
+                "structured": {"conditions": [condition], "medications": [medication]}
+            }
+        ]
+
+        table = chatbot._format_as_table(table_data)
+        assert "| Diabetes | E11.9 | - | N/A | Metformin | N/A |" in table
+        assert "None" not in table
+
+        csv = chatbot._format_as_csv(table_data)
+        assert "1,Test,Diabetes,E11.9,,N/A,Metformin,N/A,\n" in csv
+
+        formatted = chatbot._format_structured_data(table_data[0]["structured"])
+        assert "  - Diabetes (ICD-10: E11.9)\n" in formatted
+        assert "API-Validated" not in formatted
+        assert "None" not in formatted
+
+    def test_format_as_csv_quotes_commas(self):
+        """Test that CSV fields containing commas are quoted, not rewritten."""
+        chatbot = MedicalChatbot()
+
+        table_data = [
+            {
+                "doc_id": 1,
+                "title": "Smith, John",
+                "structured": {
+                    "conditions": [
+                        {"name": "Diabetes", "ai_icd10_code": "E11.9", "code_reasoning": "On metformin, A1c 8.1"}
+                    ]
+                }
+            }
+        ]
+
+        result = chatbot._format_as_csv(table_data)
+        lines = result.split("\n")
+
+        assert lines[0] == "```csv"
+        assert lines[1].startswith("Case,Document Title,")
+        assert lines[2] == '1,"Smith, John",Diabetes,E11.9,,N/A,,,"On metformin, A1c 8.1"'
+        assert lines[3] == "```"